@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Players that choose actions for auction phases.
+"""
+
+import numpy as np
+from game import CHECK, HIDE, PASS
+
+
+class Agent:
+    """
+    Base class for players.
+
+    act(phase, player) is called while player is the active player of
+    an auction phase and returns an action for AuctionPhase.act().
+    Check and hide keep the player active, so act() may be called
+    several times for one auction step (see play_step()).
+    """
+
+    def act(self, phase, player):
+        raise NotImplementedError
+
+
+class PassAgent(Agent):
+    """
+    Always passes
+    """
+
+    def act(self, phase, player):
+        return PASS
+
+
+class RandomAgent(Agent):
+    """
+    Bids the minimum raise with probability bidprob, else passes
+    """
+
+    def __init__(self, bidprob=0.3, rng=None):
+        self.bidprob = bidprob
+        self.rng = np.random.default_rng(rng)
+
+    def act(self, phase, player):
+        bid = phase.highest_bid + phase.BIDDING_STEP
+        if self.rng.random() < self.bidprob and phase.playerfunds() >= bid:
+            return ("bid", bid)
+        return PASS
+
+
+# Integer action codes, bid k of a ladder of raises is BID_CODE + k
+PASS_CODE, CHECK_CODE, HIDE_CODE, BID_CODE = range(4)
+
+
+def legal_flags(phase, raises=(1, 2)):
+    """
+    Legality of every action code for the active player of an auction
+    phase as a list of bools. Bids are highest_bid + k*BIDDING_STEP for
+    k in raises. Checking twice in one step is legal but useless, so it
+    is left out.
+    """
+    funds = phase.playerfunds()
+    flags = [True,
+             phase.can_check() and not phase.steps[-1].checked,
+             phase.can_hide()]
+    for k in raises:
+        flags.append(phase.highest_bid + k*phase.BIDDING_STEP <= funds)
+    return flags
+
+
+def action_mask(phase, raises=(1, 2)):
+    """
+    Boolean mask over the action codes of phase
+    """
+    return np.array(legal_flags(phase, raises), dtype=bool)
+
+
+def legal_codes(phase, raises=(1, 2)):
+    return np.flatnonzero(legal_flags(phase, raises))
+
+
+def action_masks(funds, highest_bid, step, raises=(1, 2), hidden=False,
+                 checked=False, check_cost=1000, hide_cost=1000):
+    """
+    action_mask() for many games at once from per game arrays (or
+    scalars) of the active player's funds, highest bids, hidden flags
+    and whether the player has checked. Returns (..., BID_CODE +
+    len(raises)) masks.
+    """
+    funds, highest_bid, hidden, checked = np.broadcast_arrays(
+        funds, highest_bid, hidden, checked)
+    bids = highest_bid[..., None] + step * np.asarray(raises)
+    return np.concatenate((
+        np.ones(funds.shape + (1,), dtype=bool),
+        ((funds >= check_cost) & ~hidden & ~checked)[..., None],
+        ((funds >= hide_cost) & ~hidden)[..., None],
+        bids <= funds[..., None]), axis=-1)
+
+
+def code_action(phase, code, raises=(1, 2)):
+    """
+    Action tuple of an action code
+    """
+    if code >= BID_CODE:
+        return ("bid",
+                phase.highest_bid + raises[code-BID_CODE]*phase.BIDDING_STEP)
+    return (PASS, CHECK, HIDE)[code]
+
+
+def action_code(phase, action, raises=(1, 2)):
+    """
+    Action code of an action tuple, ValueError for bids off the ladder
+    """
+    kind, amount = action
+    if kind != "bid":
+        return (PASS, CHECK, HIDE).index(action)
+    k, rest = divmod(amount - phase.highest_bid, phase.BIDDING_STEP)
+    if rest or k not in raises:
+        raise ValueError("Bid not on the ladder: " + repr(action))
+    return BID_CODE + raises.index(k)
+
+
+def legal_actions(phase, raises=(1, 2)):
+    """
+    Legal actions of phase as action tuples, see legal_flags()
+    """
+    flags = legal_flags(phase, raises)
+    actions = [action for action, legal in zip((PASS, CHECK, HIDE), flags)
+               if legal]
+    for k, legal in zip(raises, flags[BID_CODE:]):
+        if legal:
+            actions.append(("bid", phase.highest_bid + k*phase.BIDDING_STEP))
+    return actions
+
+
+def play_step(agent, phase, player):
+    """
+    Asks agent for actions until player's auction step is over
+    """
+    while phase.active and phase.activeplayer == player:
+        phase.act(agent.act(phase, player))
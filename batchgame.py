@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Many NumGames played in lockstep as one set of arrays.
+
+All games in a batch have the same number of players, so every auction
+takes exactly players steps and all unfinished games are always at the same
+step: they share auctionstarter, activeplayer and the deck read position.
+Only the finished mask differs from game to game.
+"""
+
+import numpy as np
+from game import makedecks
+from agents import action_masks
+
+
+class BatchNumGame:
+    """
+    n games with the rules of NumGame.
+
+    board is (n, r, c), playerfunds is (n, players), decks are
+    (n, (areas+1)*c) arrays read from the shared position deckpos.
+    Auction state is kept per game in arrays, None (no bidder, no winner)
+    is stored as -1.
+
+    Actions take per game arrays and are ignored for finished games:
+    while not batch.done():
+        batch.check(mask)   # optional, returns hidden areas
+        batch.hide(mask)    # optional
+        batch.bid(bids)     # bids <= 0 are passes
+    """
+
+    CHECK_COST = 1000
+    HIDE_COST = 1000
+    BIDDING_STEP = 1000
+    PAY = 2000
+
+    def __init__(self, n, players, c=9, areas=3, startfunds=10000,
+                 seeds=None):
+        """
+        seeds is a list of n seeds or numpy Generators, one per game.
+        Game i deals the same cards as NumGame(..., rng=seeds[i]).
+        """
+        self.n = n
+        self.players = players
+        self.areas = areas
+        self.r = players*areas + 1
+        self.c = c
+        self.winamount = c + c // 2 + 1
+        self.board = np.zeros((n, self.r, c))
+        self.playerfunds = np.full((n, players), startfunds, dtype=np.int64)
+        if seeds is None:
+            seeds = [None] * n
+        self.initdecks(seeds)
+        self.games = np.arange(n)
+        self.finished = np.zeros(n, dtype=bool)
+        self.winners = np.full(n, -1)
+        self.auctions = np.zeros(n, dtype=int) # finished auctions per game
+        self.auctionstarter = 0
+        self.newauction()
+
+    def initdecks(self, seeds):
+        decks = [makedecks(np.random.default_rng(seed), self.c, self.areas)
+                 for seed in seeds]
+        self.areadeck = np.array([areadeck for areadeck, _ in decks])
+        self.abilitydeck = np.array([abilitydeck for _, abilitydeck in decks])
+        self.deckpos = 0
+
+    def newauction(self):
+        self.activeplayer = self.auctionstarter
+        self.highest_bid = np.zeros(self.n, dtype=np.int64)
+        self.highest_bidder = np.full(self.n, -1)
+        self.hidden = np.zeros(self.n, dtype=bool)
+        self.checked = np.zeros((self.n, self.players), dtype=bool)
+
+    def done(self):
+        return self.finished.all()
+
+    def live(self, mask=None):
+        """
+        Mask of unfinished games, combined with mask if given
+        """
+        if mask is None:
+            return ~self.finished
+        return ~self.finished & np.asarray(mask, dtype=bool)
+
+# ---------- Board ----------------------------------------------
+
+    def find_rows(self, players, areas):
+        """
+        Vectorized Game.find_row
+        """
+        return np.where(areas == 0, 0, players + (areas-1)*self.players + 1)
+
+    def colfreqs(self):
+        return self.board.sum(axis=1) + self.board[:, 0]
+
+    def rowweights(self):
+        return np.einsum("grc,gc->gr", self.board, self.colfreqs())
+
+    def hiddenarea(self):
+        return self.areadeck[:, self.deckpos]
+
+    def hiddenability(self):
+        return self.abilitydeck[:, self.deckpos]
+
+    def winner(self):
+        """
+        Game.winner for every game, -1 where the game goes on.
+        Ties go to the lowest row like in Game.winner.
+        """
+        weights = self.rowweights()
+        leader = weights.argmax(axis=1)
+        decided = weights[self.games, leader] >= self.winamount
+        if self.deckpos >= self.areadeck.shape[1]:
+            decided[:] = True
+        return np.where(decided, leader, -1)
+
+# ---------- Player methods --------------------------------------
+
+    def funds(self):
+        """
+        Funds of the active player in every game
+        """
+        return self.playerfunds[:, self.activeplayer]
+
+    def can_check(self):
+        return (self.funds() >= self.CHECK_COST) & ~self.hidden
+
+    def can_hide(self):
+        return (self.funds() >= self.HIDE_COST) & ~self.hidden
+
+    def action_masks(self, raises=(1, 2)):
+        """
+        agents.action_mask() of the active player in every game,
+        finished games included
+        """
+        return action_masks(self.funds(), self.highest_bid, self.BIDDING_STEP,
+                            raises, self.hidden,
+                            self.checked[:, self.activeplayer],
+                            self.CHECK_COST, self.HIDE_COST)
+
+    def check(self, mask):
+        """
+        Active player checks in games selected by mask.
+        Returns hidden areas, -1 for games that were not checked.
+        """
+        mask = self.live(mask)
+        assert self.can_check()[mask].all()
+        self.playerfunds[mask, self.activeplayer] -= self.CHECK_COST
+        self.checked[mask, self.activeplayer] = True
+        return np.where(mask, self.hiddenarea(), -1)
+
+    def hide(self, mask):
+        mask = self.live(mask)
+        assert self.can_hide()[mask].all()
+        self.playerfunds[mask, self.activeplayer] -= self.HIDE_COST
+        self.hidden |= mask
+
+    def bid(self, bids):
+        """
+        Active player bids bids[i] in game i, zero or negative is a pass.
+        Moves every game to the next player.
+        """
+        bids = np.asarray(bids)
+        mask = self.live(bids > 0)
+        assert (self.funds()[mask] >= bids[mask]).all()
+        assert (bids[mask] >= self.highest_bid[mask] + self.BIDDING_STEP).all()
+        self.highest_bid[mask] = bids[mask]
+        self.highest_bidder[mask] = self.activeplayer
+        self.nextplayer()
+
+    def pass_bid(self):
+        self.bid(np.zeros(self.n, dtype=np.int64))
+
+# ---------- Internal methods ------------------------------------
+
+    def nextplayer(self):
+        self.activeplayer = (self.activeplayer + 1) % self.players
+        if self.activeplayer == self.auctionstarter:
+            self.finalize()
+
+    def finalize(self):
+        """
+        Ends the auction in all unfinished games, checks for winners,
+        pays the rest and starts the next auction
+        """
+        live = self.live()
+        areas = self.hiddenarea()
+        abilities = self.hiddenability()
+        self.deckpos += 1
+        won = live & (self.highest_bidder >= 0)
+        games = self.games[won]
+        bidders = self.highest_bidder[won]
+        self.playerfunds[games, bidders] -= self.highest_bid[won]
+        rows = self.find_rows(bidders, areas[won])
+        self.board[games, rows, abilities[won]] = 1
+        self.auctions[live] += 1
+
+        winners = self.winner()
+        ended = live & (winners >= 0)
+        self.winners[ended] = winners[ended]
+        self.finished |= ended
+        # Like Game.__iter__, payday also comes when the King's row 0 wins
+        self.playerfunds[live & (winners <= 0)] += self.PAY
+        self.auctionstarter = (self.auctionstarter + 1) % self.players
+        self.newauction()
+
+    def __repr__(self):
+        return "BatchNumGame: {0} games, {1} finished, auction {2}".format(
+            self.n, self.finished.sum(), self.deckpos)
+
+
+if __name__ == "__main__":
+    batch = BatchNumGame(1000, 3)
+    while not batch.done():
+        bids = batch.highest_bid + batch.BIDDING_STEP
+        bidding = (np.random.rand(batch.n) < 0.3) & (batch.funds() >= bids)
+        batch.bid(np.where(bidding, bids, 0))
+    print(batch)
+    print(np.bincount(batch.winners))
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+What one player can know about the hidden cards.
+
+The deck compositions are known from the start: c cards of every area
+and areas+1 cards of every ability. Items become public when their
+auction starts, areas when a sold auction ends or when the player
+checks. BeliefTracker keeps the counts of cards the player has not
+seen and turns them into distributions, updating in O(areas + c) per
+event and sampling in O(1) from alias tables.
+
+belief = BeliefTracker(game, player)
+...
+belief.observe(game)       # at every decision, or feed events directly
+area = belief.sample_area(rng)
+"""
+
+import random
+import numpy as np
+
+
+class AliasTable:
+    """
+    Vose's alias method: O(n) to build from weights, O(1) to sample
+    """
+
+    def __init__(self, weights):
+        n = len(weights)
+        probs = np.asarray(weights, dtype=float)
+        probs = probs * n / probs.sum()
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i in range(n) if probs[i] < 1.0]
+        large = [i for i in range(n) if probs[i] >= 1.0]
+        probs = probs.tolist()
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = probs[less]
+            self.alias[less] = more
+            probs[more] += probs[less] - 1.0
+            (small if probs[more] < 1.0 else large).append(more)
+
+    def sample(self, rng=random):
+        i = int(rng.random() * len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+class BeliefTracker:
+    """
+    Beliefs of player (None until the first observe()).
+
+    unseen[a] counts area a cards the player has not seen, including
+    cards of unsold auctions that left the deck unseen. abilities[k]
+    counts ability k cards still in the deck after the current item.
+    known is the area of the current auction if the player checked it,
+    checkers the players who checked it, hidden whether it was hidden
+    and hider the player who hid it, None if that is not known (as in
+    positions rebuilt by Game.decode()).
+    """
+
+    def __init__(self, game, player=None):
+        self.player = player
+        self.unseen = np.full(game.areas+1, game.c)
+        self.abilities = np.full(game.c, game.areas+1)
+        self.areapos = 0 # area cards accounted for
+        self.public = 0 # ability cards made public
+        self.phase = None
+        self.newauction()
+
+    def newauction(self):
+        self.known = None
+        self.checkers = set()
+        self.hidden = False
+        self.hider = None
+        self.likelihood = np.ones(len(self.unseen))
+        self.tables = {}
+
+# ---------- Events ----------------------------------------------
+
+    def check(self, player, area=None):
+        """
+        player checked the current auction, area is given if
+        it is the tracked player
+        """
+        self.checkers.add(player)
+        if player == self.player and self.known == None:
+            self.known = area
+            self.unseen[area] -= 1
+            self.tables = {}
+
+    def hide(self, player=None):
+        self.hidden = True
+        self.hider = player
+
+    def poparea(self, area=None):
+        """
+        The current auction ended, area is None if it stayed hidden
+        """
+        if self.known == None and area != None:
+            self.unseen[area] -= 1
+        self.areapos += 1
+        self.newauction()
+
+    def popability(self, ability):
+        """
+        ability became public as the item of an auction
+        """
+        self.abilities[ability] -= 1
+        self.public += 1
+        self.tables.pop("ability", None)
+
+    def weigh_area(self, likelihood):
+        """
+        Bayesian update of the current area with likelihood[a] of the
+        observed behaviour if the area is a
+        """
+        self.likelihood *= likelihood
+        self.tables = {}
+
+    def observe(self, game, player=None):
+        """
+        Catches up with the public events of game and what player saw.
+        The auction seen at the previous call tells if its area was
+        revealed, auctions ended in between are taken as unseen.
+        """
+        if player != None:
+            self.player = player
+        while self.areapos < game.areapos:
+            last = self.phase
+            sold = (last != None and not last.active and
+                    last.winner != None)
+            self.poparea(last.area if sold else None)
+            self.phase = None
+        phase = game.currentphase
+        auction = phase.type == "auction" and phase.active
+        # The item at abilitypos is public while its auction runs
+        while self.public < game.abilitypos + auction:
+            self.popability(int(game.abilitydeck[self.public]))
+        if not auction:
+            return
+        self.phase = phase
+        for checker in phase.checked:
+            if checker not in self.checkers:
+                self.check(checker, phase.area if checker == self.player
+                           else None)
+        if phase.hidden and not self.hidden:
+            self.hide(next((step.player for step in phase.steps if step.hid),
+                           None))
+
+# ---------- Distributions ---------------------------------------
+
+    def area_distribution(self):
+        """
+        Probabilities of the area of the current auction
+        """
+        if self.known != None:
+            probs = np.zeros(len(self.unseen))
+            probs[self.known] = 1.0
+            return probs
+        weights = self.unseen * self.likelihood
+        return weights / weights.sum()
+
+    def next_area_distribution(self):
+        """
+        Probabilities of the area of the next auction
+        """
+        total = self.unseen.sum()
+        if self.known != None:
+            return self.unseen / total
+        return (self.unseen - self.area_distribution()) / (total - 1)
+
+    def ability_distribution(self):
+        """
+        Probabilities of the item of the next auction
+        """
+        return self.abilities / self.abilities.sum()
+
+    def opponent_knowledge(self, player):
+        """
+        Distribution of the area player knows, None if player has not
+        checked the current auction
+        """
+        if player not in self.checkers:
+            return None
+        return self.area_distribution()
+
+# ---------- Sampling --------------------------------------------
+
+    def table(self, name, distribution):
+        if name not in self.tables:
+            self.tables[name] = AliasTable(distribution())
+        return self.tables[name]
+
+    def sample_area(self, rng=random):
+        return self.table("area", self.area_distribution).sample(rng)
+
+    def sample_next_area(self, rng=random):
+        return self.table("next", self.next_area_distribution).sample(rng)
+
+    def sample_ability(self, rng=random):
+        return self.table("ability", self.ability_distribution).sample(rng)
+
+    def unseen_areas(self):
+        """
+        Unseen area cards as an array, for dealing whole decks
+        """
+        return np.repeat(np.arange(len(self.unseen)), self.unseen)
+
+    def unseen_abilities(self):
+        return np.repeat(np.arange(len(self.abilities)), self.abilities)
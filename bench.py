@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Throughput measurements for the game engines and the network.
+
+suite() measures everything as rates, higher is better. Results can be
+saved as a JSON baseline and later runs compared against it:
+
+python bench.py --save baseline.json
+python bench.py --compare baseline.json --threshold 0.15
+"""
+
+import argparse
+import copy
+import json
+import platform
+import random
+import sys
+import time
+import numpy as np
+from game import PASS
+from numgame import NumGame
+from bitgame import BitGame
+from sparsegame import SparseGame
+from batchgame import BatchNumGame
+from nn import ANN
+
+VERSION = 1
+
+
+def play_random(game, bidprob=0.3):
+    """
+    Plays game to the end with random bidders. Returns game.
+    """
+    for phase, player in game:
+        if phase.type == "auction":
+            bid = phase.highest_bid + phase.BIDDING_STEP
+            if random.random() < bidprob and phase.playerfunds() >= bid:
+                phase.bid(bid)
+            else:
+                phase.pass_bid()
+    return game
+
+
+def play_random_batch(batch, bidprob=0.3):
+    """
+    Vectorized play_random for BatchNumGame
+    """
+    while not batch.done():
+        bids = batch.highest_bid + batch.BIDDING_STEP
+        bidding = (np.random.rand(batch.n) < bidprob) & (batch.funds() >= bids)
+        batch.bid(np.where(bidding, bids, 0))
+    return batch
+
+
+def games_per_second(cls=NumGame, games=200, players=3, **kwargs):
+    start = time.perf_counter()
+    for i in range(games):
+        play_random(cls(players, **kwargs))
+    return games / (time.perf_counter() - start)
+
+
+def copies_per_second(cls=NumGame, copies=2000, players=3, **kwargs):
+    """
+    copy.deepcopy speed for a game in the middle of an auction
+    """
+    game = cls(players, **kwargs)
+    for i in range(game.c):
+        game.buy(i % players)
+    game.currentphase.check()
+    start = time.perf_counter()
+    for i in range(copies):
+        copy.deepcopy(game)
+    return copies / (time.perf_counter() - start)
+
+
+def makes_per_second(cls=NumGame, players=3, **kwargs):
+    """
+    make()/unmake() pairs per second along a random game
+    """
+    game = cls(players, **kwargs)
+    pairs = 0
+    start = time.perf_counter()
+    while game.winner() == None:
+        phase = game.currentphase
+        bid = phase.highest_bid + phase.BIDDING_STEP
+        game.unmake(game.make(PASS))
+        pairs += 1
+        if phase.playerfunds() >= bid:
+            game.unmake(game.make(("bid", bid)))
+            pairs += 1
+        if random.random() < 0.3 and phase.playerfunds() >= bid:
+            game.make(("bid", bid))
+        else:
+            game.make(PASS)
+    return pairs / (time.perf_counter() - start)
+
+
+def batch_games_per_second(games=10000, players=3, **kwargs):
+    start = time.perf_counter()
+    play_random_batch(BatchNumGame(games, players, **kwargs))
+    return games / (time.perf_counter() - start)
+
+
+def rate(function, min_time=0.2):
+    """
+    Calls function until min_time seconds have passed,
+    returns calls per second
+    """
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return calls / elapsed
+
+
+def midgame(cls=NumGame, players=3, c=9, areas=3, fill=0.5, seed=0):
+    """
+    Game with about fill of its deck bought by random players
+    """
+    game = cls(players, c=c, areas=areas, rng=seed, startfunds=10**9)
+    rng = random.Random(seed)
+    for i in range(int(fill * game.decksizes()[0])):
+        game.buy(rng.randrange(players))
+    return game
+
+
+def query_rates(cls=NumGame, min_time=0.2, **kwargs):
+    """
+    winner(), rowweights() and colfreqs() calls per second
+    on a midgame() board
+    """
+    game = midgame(cls, **kwargs)
+    return {name: rate(getattr(game, name), min_time)
+            for name in ("winner", "rowweights", "colfreqs")}
+
+
+def auction_steps_per_second(cls=NumGame, games=50, players=3, **kwargs):
+    """
+    AuctionPhase bid/pass steps per second in random games
+    """
+    steps = 0
+    start = time.perf_counter()
+    for i in range(games):
+        game = play_random(cls(players, rng=i, **kwargs))
+        steps += game.areapos * players
+    return steps / (time.perf_counter() - start)
+
+
+def ann_rates(layers, min_time=0.2, seed=0):
+    """
+    out_vector() and backprop() examples per second for a net with
+    layers neurons per layer
+    """
+    np.random.seed(seed)
+    net = ANN.generated_net(*layers, rnd=True)
+    in_vector = np.random.rand(layers[0])
+    target = np.random.rand(layers[-1])
+    return {"out_vector": rate(lambda: net.out_vector(in_vector), min_time),
+            "backprop": rate(lambda: net.backprop(in_vector, target),
+                             min_time)}
+
+
+GAME_SIZES = [dict(players=3, c=9, areas=3),
+              dict(players=3, c=18, areas=3),
+              dict(players=3, c=36, areas=3),
+              dict(players=6, c=9, areas=3),
+              dict(players=3, c=9, areas=6),
+              dict(players=20, c=30, areas=6)]
+
+ANN_LAYERS = [(10, 20, 1), (100, 50, 1), (400, 200, 50, 1)]
+
+
+def sizename(size):
+    return ",".join("{0}={1}".format(k, v) for k, v in sorted(size.items()))
+
+
+def suite(quick=False):
+    """
+    Runs all benchmarks, returns {name: rate}
+    """
+    min_time = 0.05 if quick else 0.3
+    games = 10 if quick else 100
+    results = {}
+    for cls in [NumGame, BitGame, SparseGame]:
+        name = cls.__name__
+        results[name + "/games"] = games_per_second(cls, games)
+        results[name + "/auction_steps"] = auction_steps_per_second(
+            cls, games // 2)
+        results[name + "/make_unmakes"] = makes_per_second(cls)
+        results[name + "/copies"] = copies_per_second(cls, games * 10)
+        for size in GAME_SIZES:
+            for query, value in query_rates(cls, min_time, **size).items():
+                results["{0}/{1}/{2}".format(name, query,
+                                             sizename(size))] = value
+    results["BatchNumGame/games"] = batch_games_per_second(games * 10)
+    for layers in ANN_LAYERS:
+        for method, value in ann_rates(layers, min_time).items():
+            results["ANN/{0}/{1}".format(
+                method, "-".join(map(str, layers)))] = value
+    return results
+
+
+def save_baseline(results, path):
+    with open(path, "w") as f:
+        json.dump({"version": VERSION, "python": platform.python_version(),
+                   "machine": platform.machine(), "results": results},
+                  f, indent=1, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline["version"] != VERSION:
+        raise ValueError("Unsupported baseline version " +
+                         str(baseline["version"]))
+    return baseline["results"]
+
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Returns [(name, baseline rate, rate, ratio)] for benchmarks
+    slower than baseline by more than threshold (0.1 is 10%)
+    """
+    regressions = []
+    for name, old in sorted(baseline.items()):
+        if name in results and results[name] < old * (1 - threshold):
+            regressions.append((name, old, results[name],
+                                results[name] / old))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--save", help="write results as a baseline")
+    parser.add_argument("--compare", help="baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="allowed slowdown, 0.1 is 10%%")
+    parser.add_argument("--quick", action="store_true",
+                        help="shorter, noisier runs")
+    args = parser.parse_args(argv)
+    results = suite(args.quick)
+    baseline = load_baseline(args.compare) if args.compare else {}
+    for name, value in sorted(results.items()):
+        line = "{0:50}{1:14.0f}/s".format(name, value)
+        if name in baseline:
+            line += "{0:9.2f}x".format(value / baseline[name])
+        print(line)
+    if args.save:
+        save_baseline(results, args.save)
+    regressions = compare(results, baseline, args.threshold)
+    for name, old, new, ratio in regressions:
+        print("REGRESSION {0}: {1:.0f}/s -> {2:.0f}/s ({3:.2f}x)".format(
+            name, old, new, ratio))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Game with the board stored as one integer bitmask per row.
+"""
+
+import numpy as np
+from game import *
+
+try:
+    popcount = int.bit_count
+except AttributeError:
+    def popcount(x):
+        return bin(x).count("1")
+
+
+class BitGame(Game):
+    """
+    Game with bit c of rows[r] set when row r owns ability c.
+
+    Column masks (bit r of colmasks[c] set when row r owns ability c)
+    give column frequencies by popcount. Row weights are cached and
+    updated by set() in O(rows owning the column), so the board should
+    only be changed through set(). boardkey() is a cheap hashable key.
+    """
+
+    def emptyboard(self):
+        self.rows = [0] * self.r
+        self.colmasks = [0] * self.c
+        self.weights = [0] * self.r
+
+    @property
+    def board(self):
+        return BoardView(self.cell, self.r, self.c)
+
+    def cell(self, r, c):
+        return (self.rows[r] >> c) & 1
+
+    def set(self, r, c, val=1):
+        bit = 1 << c
+        old = (self.rows[r] >> c) & 1
+        val = 1 if val else 0
+        if old == val:
+            return
+        self.hashcell(r, c, old, val)
+        delta = val - old
+        freq_delta = 2*delta if r == 0 else delta
+        # Rows already owning c gain the frequency change
+        mask = self.colmasks[c]
+        while mask:
+            low = mask & -mask
+            self.weights[low.bit_length() - 1] += freq_delta
+            mask ^= low
+        self.rows[r] ^= bit
+        self.colmasks[c] ^= 1 << r
+        self.weights[r] += delta * self.colfreq(c)
+
+    def colfreq(self, c):
+        mask = self.colmasks[c]
+        return popcount(mask) + (mask & 1)
+
+    def colfreqs(self):
+        return np.array([self.colfreq(c) for c in range(self.c)])
+
+    def rowweights(self):
+        return np.array(self.weights)
+
+    def leader(self):
+        weights = self.weights
+        max_weight = max(weights)
+        return weights.index(max_weight), max_weight
+
+    def has(self, player, area, ability):
+        r = self.find_row(player, area)
+        return (self.rows[r] >> ability) & 1
+
+    def boardvector(self):
+        rows = np.array(self.rows, dtype=np.int64)
+        return ((rows[:, None] >> np.arange(self.c)) & 1).ravel()
+
+    def boardkey(self):
+        return tuple(self.rows)
+
+
+if __name__ == "__main__":
+    bg = BitGame(2)
+    bg.setforking(3)
+    bg.setforplayer(1, 2, 3)
+    print(repr(bg))
+    print(bg.boardkey())
@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo counterfactual regret minimization over an abstracted game
+(see docs/ailinks.txt).
+
+The abstraction buckets an auction decision by the player's funds, the
+strength of their best row (rowweights) against the best other row,
+the frequency of the item on sale and the bid level. Abstract actions
+are pass and raises of k*BIDDING_STEP; checking and hiding are not
+played. Regrets and average strategies are dense numpy tables with a
+row per bucket, so the exported Policy looks moves up in O(1).
+
+Training is outcome sampling MCCFR: every iteration deals a new game,
+plays one trajectory and updates the regrets of one traversing player
+with importance weights. Workers sample batches of iterations against
+a snapshot of the regrets and the deltas are summed up.
+
+cfr = MCCFR(players=3)
+cfr.train(100000, processes=4)
+agent = PolicyAgent(cfr.policy())
+"""
+
+import multiprocessing
+import numpy as np
+from game import PASS
+from numgame import NumGame
+from agents import Agent, BID_CODE, action_mask
+
+
+class Abstraction:
+    """
+    Maps auction decisions to bucket indices and abstract actions
+    (0 pass, 1.. raises) to game actions
+    """
+
+    def __init__(self, fund_buckets=6, fund_step=3000, strength_buckets=4,
+                 freq_buckets=4, bid_buckets=5, raises=(1, 2)):
+        self.fund_step = fund_step
+        self.raises = tuple(raises)
+        self.shape = (fund_buckets, strength_buckets, 3, freq_buckets,
+                      bid_buckets, 2)
+        self.size = int(np.prod(self.shape))
+        self.n_actions = 1 + len(self.raises)
+
+    def params(self):
+        return {"fund_buckets": self.shape[0], "fund_step": self.fund_step,
+                "strength_buckets": self.shape[1],
+                "freq_buckets": self.shape[3], "bid_buckets": self.shape[4],
+                "raises": self.raises}
+
+    def bucket(self, game, phase, player):
+        """
+        Index of the decision of player in auction phase
+        """
+        funds, strength, _, freqs, bids, _ = self.shape
+        weights = game.rowweights()
+        own = weights[1+player::game.players].max()
+        weights[1+player::game.players] = -1
+        other = weights.max()
+        lead = 0 if own < other else 1 if own == other else 2
+        last = int((player + 1) % game.players == game.auctionstarter)
+        return int(np.ravel_multi_index((
+            min(game.playerfunds[player] // self.fund_step, funds - 1),
+            min(int(strength * own / game.winamount), strength - 1),
+            lead,
+            min(int(game.colfreqs()[phase.item]), freqs - 1),
+            min(phase.highest_bid // phase.BIDDING_STEP, bids - 1),
+            last), self.shape))
+
+    def legal(self, phase):
+        """
+        Boolean mask of the abstract actions the active player can take
+        """
+        mask = action_mask(phase, self.raises)
+        return np.concatenate(([True], mask[BID_CODE:]))
+
+    def action(self, phase, index):
+        if index == 0:
+            return PASS
+        return ("bid",
+                phase.highest_bid + self.raises[index-1]*phase.BIDDING_STEP)
+
+
+def regretmatching(regrets, mask):
+    """
+    Strategy proportional to positive regrets on legal actions,
+    uniform if there are none
+    """
+    positive = np.where(mask, np.maximum(regrets, 0.0), 0.0)
+    total = positive.sum()
+    if total > 0:
+        return positive / total
+    return mask / mask.sum()
+
+
+def sample_iterations(regrets, abstraction, players, iterations, seed,
+                      epsilon=0.6, game_cls=NumGame, gameargs={}):
+    """
+    Outcome sampling MCCFR iterations against fixed regrets.
+    Returns (regret deltas, strategy deltas) as dense tables.
+    """
+    rng = np.random.default_rng(seed)
+    dregrets = np.zeros_like(regrets)
+    dstrategy = np.zeros_like(regrets)
+    for t in range(iterations):
+        traverser = t % players
+        game = game_cls(players, rng=rng, **gameargs)
+        # Others and chance play on-policy, so their probabilities cancel
+        # out of the importance weights; only the traverser's count.
+        # path has (bucket, sigma, action, reach, sample probability)
+        # for the traverser's decisions.
+        path = []
+        reach = 1.0
+        sample = 1.0
+        for phase, player in game:
+            if phase.type != "auction":
+                continue
+            mask = abstraction.legal(phase)
+            bucket = abstraction.bucket(game, phase, player)
+            sigma = regretmatching(regrets[bucket], mask)
+            if player == traverser:
+                policy = epsilon * mask / mask.sum() + (1 - epsilon) * sigma
+                action = rng.choice(len(policy), p=policy)
+                path.append((bucket, sigma, action, reach, sample))
+                reach *= sigma[action]
+                sample *= policy[action]
+            else:
+                action = rng.choice(len(sigma), p=sigma)
+            phase.act(abstraction.action(phase, action))
+        winner, _ = game.rowinfo(game.winner())
+        utility = float(winner == traverser) / sample
+        tail = 1.0
+        for bucket, sigma, action, prefix_reach, prefix in reversed(path):
+            value = utility * tail
+            dregrets[bucket] -= value * sigma[action]
+            dregrets[bucket, action] += value
+            dstrategy[bucket] += prefix_reach / prefix * sigma
+            tail *= sigma[action]
+    return dregrets, dstrategy
+
+
+def sampleworker(args):
+    return sample_iterations(*args)
+
+
+class MCCFR:
+    """
+    Regret and strategy tables for players-player games.
+    plus floors regrets at zero after every batch (regret matching+).
+    """
+
+    def __init__(self, players=3, abstraction=None, epsilon=0.6,
+                 plus=True, seed=0, game_cls=NumGame, **gameargs):
+        self.players = players
+        self.abstraction = Abstraction() if abstraction == None \
+            else abstraction
+        shape = (self.abstraction.size, self.abstraction.n_actions)
+        self.regrets = np.zeros(shape)
+        self.strategy = np.zeros(shape)
+        self.epsilon = epsilon
+        self.plus = plus
+        self.seeds = np.random.SeedSequence(seed)
+        self.game_cls = game_cls
+        self.gameargs = gameargs
+        self.iterations = 0
+
+    def jobs(self, batches, batch_size):
+        for seed in self.seeds.spawn(batches):
+            yield (self.regrets, self.abstraction, self.players, batch_size,
+                   seed, self.epsilon, self.game_cls, self.gameargs)
+
+    def add(self, deltas):
+        dregrets, dstrategy = deltas
+        self.regrets += dregrets
+        self.strategy += dstrategy
+
+    def train(self, iterations, processes=1, batch_size=1000):
+        """
+        Runs iterations in batches of batch_size. With processes > 1
+        a round of one batch per process samples against the same
+        regrets.
+        """
+        pool = multiprocessing.Pool(processes) if processes > 1 else None
+        try:
+            while iterations > 0:
+                batches = min(processes,
+                              -(-iterations // batch_size))
+                size = min(batch_size, -(-iterations // batches))
+                if pool == None:
+                    results = map(sampleworker, self.jobs(batches, size))
+                else:
+                    results = pool.map(sampleworker, self.jobs(batches, size))
+                for deltas in results:
+                    self.add(deltas)
+                if self.plus:
+                    np.maximum(self.regrets, 0.0, out=self.regrets)
+                self.iterations += batches * size
+                iterations -= batches * size
+        finally:
+            if pool != None:
+                pool.close()
+                pool.join()
+
+    def policy(self):
+        return Policy.from_sums(self.abstraction, self.strategy)
+
+
+class Policy:
+    """
+    Average strategy as a float32 lookup table, a row per bucket
+    """
+
+    def __init__(self, abstraction, table):
+        self.abstraction = abstraction
+        self.table = table
+
+    @classmethod
+    def from_sums(cls, abstraction, strategy):
+        totals = strategy.sum(axis=1, keepdims=True)
+        table = np.where(totals > 0, strategy / np.maximum(totals, 1e-300),
+                         1.0 / strategy.shape[1])
+        return cls(abstraction, table.astype(np.float32))
+
+    def probabilities(self, game, phase, player):
+        """
+        Action probabilities of player in auction phase, renormalized
+        over legal actions
+        """
+        mask = self.abstraction.legal(phase)
+        probs = np.where(mask,
+                         self.table[self.abstraction.bucket(game, phase,
+                                                            player)], 0.0)
+        total = probs.sum()
+        return probs / total if total > 0 else mask / mask.sum()
+
+    def save(self, path):
+        np.savez(path, table=self.table, **self.abstraction.params())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            params = {key: data[key].tolist() for key in data.files
+                      if key != "table"}
+            return cls(Abstraction(**params), data["table"])
+
+
+class PolicyAgent(Agent):
+    """
+    Samples actions from a Policy
+    """
+
+    def __init__(self, policy, rng=None):
+        self.policy = policy
+        self.rng = np.random.default_rng(rng)
+
+    def act(self, phase, player):
+        probs = self.policy.probabilities(phase.game, phase, player)
+        index = self.rng.choice(len(probs), p=probs)
+        return self.policy.abstraction.action(phase, index)
+
+
+if __name__ == "__main__":
+    import functools
+    import time
+    from agents import RandomAgent
+    from tournament import tournament
+    cfr = MCCFR(players=3)
+    start = time.perf_counter()
+    cfr.train(20000, processes=4)
+    print(cfr.iterations, "iterations", time.perf_counter() - start, "s")
+    policy = cfr.policy()
+    print(tournament([functools.partial(PolicyAgent, policy), RandomAgent,
+                      RandomAgent], 1000))
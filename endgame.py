@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Exact endgame solver.
+
+Expectimax over the auctions left in the decks, every player maximizing
+their own chance to win (max-n). The players act on what the solving
+player knows: the area of an auction is drawn when the auction ends,
+from the area cards that player has not seen (a BeliefTracker), and the
+item of the next auction when it starts, from the public counts of the
+items left. So every composition is one chance node instead of one
+branch per deck order, and the true order of the deck is never read.
+Bids are highest_bid + k*BIDDING_STEP for k in raises. Checking and
+hiding only move information and money around and are left out.
+
+belief = BeliefTracker(game)
+belief.observe(game, player)
+solver = EndgameSolver()
+values, action = solver.solve(game, belief)
+"""
+
+import copy
+import numpy as np
+from agents import Agent, RandomAgent, legal_actions
+from belief import BeliefTracker
+
+
+def swapcard(deck, pos, card):
+    """
+    Swaps the first card from pos on in deck to pos, returns where it
+    was. Swapping pos and where again undoes it.
+    """
+    where = pos + int(np.flatnonzero(deck[pos:] == card)[0])
+    swap(deck, pos, where)
+    return where
+
+
+def swap(deck, i, j):
+    deck[i], deck[j] = deck[j], deck[i]
+
+
+def chances(cards, size):
+    """
+    (card, probability) for the cards in an int array
+    """
+    return count_chances(np.bincount(cards, minlength=size))
+
+
+def count_chances(counts):
+    """
+    (card, probability) for counts[card] cards of every card
+    """
+    total = counts.sum()
+    return [(card, count / total)
+            for card, count in enumerate(counts.tolist()) if count]
+
+
+class EndgameSolver:
+    """
+    Solves positions at the start or in the middle of an auction.
+    The transposition table maps a state key to (values, action) and is
+    kept between solves of one game; clear() it for a new game.
+    """
+
+    def __init__(self, raises=(1, 2), max_table=1000000):
+        self.raises = raises
+        self.max_table = max_table
+        self.table = {}
+        self.nodes = 0
+        self.known = (None, None)
+        self.unseen = None
+
+    def clear(self):
+        self.table = {}
+
+    def solve(self, game, belief):
+        """
+        Returns (values, action): winning probabilities of every player
+        and the best action of the active player, whose BeliefTracker
+        belief has observed game. Areas are drawn from belief.unseen and
+        belief.known is the area of the current auction if checked.
+        """
+        game = copy.deepcopy(game)
+        game.profiler = None
+        game.areadeck = game.areadeck.copy()
+        game.abilitydeck = game.abilitydeck.copy()
+        if len(self.table) > self.max_table:
+            self.clear()
+        self.known = (game.areapos, belief.known)
+        self.unseen = belief.unseen.copy()
+        return self.value(game)
+
+    def actions(self, phase):
+        return [action for action in legal_actions(phase, self.raises)
+                if action[0] in ("pass", "bid")]
+
+    def knownarea(self, game):
+        pos, area = self.known
+        return area if game.areapos == pos else None
+
+    def key(self, game):
+        """
+        Compact state: the public encoding, the known area and the
+        counts of the unseen areas and the items left
+        """
+        return (game.statekey(), self.knownarea(game), self.unseen.tobytes(),
+                np.bincount(game.abilitydeck[game.abilitypos+1:],
+                            minlength=game.c).tobytes())
+
+    def terminal(self, game):
+        """
+        Values of an ended game, None if it goes on
+        """
+        winner = game.winner()
+        if winner == None:
+            return None
+        values = np.zeros(game.players)
+        player, _ = game.rowinfo(winner)
+        if player != None:
+            values[player] = 1.0
+        return values
+
+    def value(self, game):
+        """
+        (values, best action) of an active auction
+        """
+        key = self.key(game)
+        if key in self.table:
+            return self.table[key]
+        self.nodes += 1
+        phase = game.currentphase
+        player = phase.activeplayer
+        final = (player + 1) % game.players == game.auctionstarter
+        best = None
+        for action in self.actions(phase):
+            if final:
+                values = self.finalvalue(game, action)
+            else:
+                undo = game.make(action)
+                values = self.value(game)[0]
+                game.unmake(undo)
+            if best == None or values[player] > best[0][player] + 1e-12:
+                best = (values, action)
+        self.table[key] = best
+        return best
+
+    def finalvalue(self, game, action):
+        """
+        Expected values of the action ending the auction,
+        over the unseen areas it can be for if it sells
+        """
+        phase = game.currentphase
+        area = phase.area
+        known = self.knownarea(game)
+        sold = action[0] == "bid" or phase.highest_bidder != None
+        # The area of an unsold auction stays unseen and does not matter
+        drawn = int(known == None and sold)
+        if drawn:
+            outcomes = count_chances(self.unseen)
+        else:
+            outcomes = [(area if known == None else known, 1.0)]
+        values = np.zeros(game.players)
+        for card, probability in outcomes:
+            self.unseen[card] -= drawn
+            game.areadeck[game.areapos] = phase.area = card
+            undo = game.make(action)
+            values += probability * self.nextvalue(game)
+            game.unmake(undo)
+            self.unseen[card] += drawn
+        game.areadeck[game.areapos] = phase.area = area
+        return values
+
+    def nextvalue(self, game):
+        """
+        Expected values after an auction, over the items
+        the next auction can be for
+        """
+        values = self.terminal(game)
+        if values is not None:
+            return values
+        phase = game.currentphase
+        item = phase.item
+        values = np.zeros(game.players)
+        pos = game.abilitypos
+        for card, probability in chances(game.abilitydeck[pos:], game.c):
+            where = swapcard(game.abilitydeck, pos, card)
+            phase.item = card
+            values += probability * self.value(game)[0]
+            swap(game.abilitydeck, pos, where)
+        phase.item = item
+        return values
+
+
+class EndgameAgent(Agent):
+    """
+    Plays solver moves when at most threshold cards are left in the
+    decks, else asks the fallback agent. It follows the game from its
+    first decision to know the areas of the auctions sold so far.
+    """
+
+    def __init__(self, fallback=None, threshold=3, raises=(1, 2)):
+        self.fallback = RandomAgent() if fallback == None else fallback
+        self.threshold = threshold
+        self.solver = EndgameSolver(raises)
+        self.game = None
+        self.belief = None
+
+    def act(self, phase, player):
+        game = phase.game
+        if game is not self.game:
+            self.game = game
+            self.belief = BeliefTracker(game)
+            self.solver.clear()
+        self.belief.observe(game, player)
+        if game.decksizes()[0] > self.threshold:
+            return self.fallback.act(phase, player)
+        return self.solver.solve(game, self.belief)[1]
+
+
+if __name__ == "__main__":
+    import time
+    from numgame import NumGame
+    from tournament import tournament
+    game = NumGame(3, rng=2)
+    agent = RandomAgent(rng=2)
+    for phase, player in game:
+        if phase.type == "auction":
+            if game.decksizes()[0] <= 3:
+                break
+            phase.act(agent.act(phase, player))
+    belief = BeliefTracker(game)
+    belief.observe(game, game.currentphase.activeplayer)
+    start = time.perf_counter()
+    solver = EndgameSolver()
+    print(solver.solve(game, belief), solver.nodes, "nodes",
+          time.perf_counter() - start, "s")
+    print(tournament([EndgameAgent, RandomAgent, RandomAgent], 300))
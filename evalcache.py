@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Bounded cache of ANN evaluations of game positions.
+
+Search reaches the same position through different move orders. An
+EvalCache keeps the network outputs of recently evaluated positions,
+keyed by Game.statehash() (or the exact statekey()) and the extra
+arguments of the feature function, and evicts the least recently used
+entry when full. It is cleared when the network trains (ANN.version
+changes) or gets a new conn_list.
+
+cache = EvalCache(net, lambda game, player: ..., size=100000)
+value = cache.evaluate(game, player)
+values = cache.evaluate_batch(games, players)   # one call for misses
+print(cache.hit_rate())
+"""
+
+from collections import OrderedDict
+import numpy as np
+
+
+class EvalCache:
+    """
+    Outputs of ann for in vectors features(game, *args), at most size
+    entries. exact keys on statekey() instead of the 64 bit statehash().
+    Positions that differ only in what features() reads beyond the
+    public state need that as an argument.
+    """
+
+    def __init__(self, ann, features, size=65536, exact=False):
+        self.ann = ann
+        self.features = features
+        self.size = size
+        self.exact = exact
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.weights = (ann.conn_list, ann.version)
+
+    def key(self, game, args):
+        state = game.statekey() if self.exact else game.statehash()
+        return (state,) + tuple(args)
+
+    def check_weights(self):
+        """
+        Clears the cache if ann has changed since it was filled
+        """
+        conn_list, version = self.weights
+        if self.ann.conn_list is not conn_list or \
+                self.ann.version != version:
+            self.clear()
+            self.invalidations += 1
+            self.weights = (self.ann.conn_list, self.ann.version)
+
+    def store(self, key, out):
+        self.entries[key] = out
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, key):
+        """
+        Cached output for key or None, counting the hit or miss
+        """
+        out = self.entries.get(key)
+        if out is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return out
+
+    def evaluate(self, game, *args):
+        """
+        ann.out_vector(features(game, *args)), cached
+        """
+        self.check_weights()
+        key = self.key(game, args)
+        out = self.lookup(key)
+        if out is None:
+            out = self.ann.out_vector(self.features(game, *args))
+            self.store(key, out)
+        return out
+
+    def evaluate_batch(self, games, *args):
+        """
+        Outputs for games as rows of a matrix, args are sequences with
+        an argument per game. Misses are evaluated in one batched pass.
+        """
+        self.check_weights()
+        keys = [self.key(game, extra)
+                for game, extra in zip(games, zip(*args) if args
+                                       else [()] * len(games))]
+        outs = [self.lookup(key) for key in keys]
+        missed = {}
+        for i, (key, out) in enumerate(zip(keys, outs)):
+            if out is None:
+                missed.setdefault(key, []).append(i)
+        if missed:
+            firsts = [rows[0] for rows in missed.values()]
+            in_matrix = np.array([self.features(games[i],
+                                                *[arg[i] for arg in args])
+                                  for i in firsts])
+            out_matrix = self.ann.layer_matrices(in_matrix)[-1]
+            for (key, rows), out in zip(missed.items(), out_matrix):
+                self.store(key, out)
+                for i in rows:
+                    outs[i] = out
+        return np.array(outs)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"size": len(self.entries), "hits": self.hits,
+                "misses": self.misses, "hit_rate": self.hit_rate(),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations}
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Neuroevolution of bidding networks.
+
+A Population keeps size networks of the same shape as stacked weight
+tensors, one (size, out, in+1) array per layer with the bias in the
+last column like ANN.conn_list. Networks play each other in
+BatchNumGames; every decision of all games is one batched forward pass
+with the weights of each game's active network. Selection and mutation
+work on whole tensors.
+
+population = Population(48)
+for generation in range(100):
+    fitness = population.evaluate(processes=4)
+    population.select(fitness)
+"""
+
+import multiprocessing
+import numpy as np
+from scipy.special import expit as sigmoid
+from batchgame import BatchNumGame
+from agents import Agent
+from game import PASS
+from nn import ANN
+
+N_FEATURES = 8
+MONEY = 10000.0
+
+
+def features(funds, highest_bid, has_bidder, itemfreq, own, other,
+             progress, last, maxfreq, winamount):
+    """
+    Network inputs from scalars or per game arrays: funds of the
+    player, bid level, item frequency, best own and other row weights,
+    deck progress and whether the player is the last to act
+    """
+    return np.stack(np.broadcast_arrays(
+        funds / MONEY, highest_bid / MONEY, has_bidder, itemfreq / maxfreq,
+        own / winamount, other / winamount, progress, last),
+        axis=-1).astype(float)
+
+
+def batch_features(batch):
+    """
+    Inputs for the active player of every game in a BatchNumGame
+    """
+    player = batch.activeplayer
+    weights = batch.rowweights()
+    own = weights[:, 1+player::batch.players].max(axis=1)
+    weights[:, 1+player::batch.players] = -1
+    itemfreq = batch.colfreqs()[batch.games, batch.hiddenability()]
+    return features(batch.funds(), batch.highest_bid,
+                    batch.highest_bidder >= 0, itemfreq, own,
+                    weights.max(axis=1),
+                    batch.deckpos / batch.areadeck.shape[1],
+                    (player + 1) % batch.players == batch.auctionstarter,
+                    batch.r + 1, batch.winamount)
+
+
+def game_features(game, phase, player):
+    """
+    Inputs for player in an auction phase of a Game,
+    the same as batch_features() for the same position
+    """
+    weights = game.rowweights()
+    own = weights[1+player::game.players].max()
+    weights[1+player::game.players] = -1
+    return features(game.playerfunds[player], phase.highest_bid,
+                    phase.highest_bidder != None,
+                    game.colfreqs()[phase.item], own, weights.max(),
+                    game.areapos / len(game.areadeck),
+                    (player + 1) % game.players == game.auctionstarter,
+                    game.r + 1, game.winamount)
+
+
+def forward(weights, nets, in_matrix):
+    """
+    Outputs of networks nets[i] for inputs in_matrix[i]
+    """
+    layer = in_matrix
+    for conn in weights:
+        conns = conn[nets]
+        layer = sigmoid(np.einsum("goi,gi->go", conns[:, :, :-1], layer) +
+                        conns[:, :, -1])
+    return layer
+
+
+def decide(out, highest_bid, funds, step):
+    """
+    Bids from network outputs: out[..., 0] > 0.5 bids, raising two
+    steps if out[..., 1] > 0.5 and affordable. 0 is a pass.
+    """
+    raises = np.where(out[..., 1] > 0.5, 2, 1)
+    bids = highest_bid + raises * step
+    bids = np.where(bids > funds, highest_bid + step, bids)
+    return np.where((out[..., 0] > 0.5) & (bids <= funds), bids, 0)
+
+
+def play_population(weights, seats, seeds=None, **gameargs):
+    """
+    Plays len(seats) games, seats[i, player] is the network playing
+    as player in game i. Returns (winning players, -1 for the King,
+    final playerfunds).
+    """
+    players = seats.shape[1]
+    batch = BatchNumGame(len(seats), players, seeds=seeds, **gameargs)
+    while not batch.done():
+        nets = seats[:, batch.activeplayer]
+        out = forward(weights, nets, batch_features(batch))
+        batch.bid(decide(out, batch.highest_bid, batch.funds(),
+                         batch.BIDDING_STEP))
+    winners = np.where(batch.winners > 0, (batch.winners - 1) % players, -1)
+    return winners, batch.playerfunds
+
+
+def playworker(args):
+    weights, seats, seeds, gameargs = args
+    return play_population(weights, seats, seeds, **gameargs)
+
+
+class Population:
+    """
+    size networks with layers neurons per layer,
+    layers[0] must be N_FEATURES
+    """
+
+    def __init__(self, size, layers=(N_FEATURES, 12, 2), players=3,
+                 rng=None, **gameargs):
+        if size % players:
+            raise ValueError("Population size must be a multiple of players")
+        assert layers[0] == N_FEATURES
+        self.size = size
+        self.players = players
+        self.rng = np.random.default_rng(rng)
+        self.weights = [self.rng.uniform(-1, 1, (size, out_n, in_n + 1))
+                        for in_n, out_n in zip(layers[:-1], layers[1:])]
+        self.gameargs = gameargs
+        self.generation = 0
+
+    def seating(self, games_per_net):
+        """
+        (games, players) seats: every network plays games_per_net
+        games against random opponents
+        """
+        return np.concatenate([self.rng.permutation(self.size)
+                               for i in range(games_per_net)]) \
+            .reshape(-1, self.players)
+
+    def evaluate(self, games_per_net=6, fund_weight=0.5, processes=1):
+        """
+        Mean fitness of every network: 1 for a win plus fund_weight
+        times its share of the funds at the end of the game
+        """
+        seats = self.seating(games_per_net)
+        seeds = self.rng.integers(2**63, size=len(seats)).tolist()
+        if processes > 1:
+            chunks = np.array_split(np.arange(len(seats)), processes)
+            jobs = [(self.weights, seats[chunk], [seeds[i] for i in chunk],
+                     self.gameargs) for chunk in chunks if len(chunk)]
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(playworker, jobs)
+            winners = np.concatenate([w for w, _ in results])
+            funds = np.concatenate([f for _, f in results])
+        else:
+            winners, funds = play_population(self.weights, seats, seeds,
+                                             **self.gameargs)
+        scores = (np.arange(self.players) == winners[:, None]) + \
+            fund_weight * funds / funds.sum(axis=1, keepdims=True)
+        return (np.bincount(seats.ravel(), scores.ravel(), self.size) /
+                np.bincount(seats.ravel(), minlength=self.size))
+
+    def select(self, fitness, elite=0.1, tournament=3, sigma=0.1, rate=0.2):
+        """
+        Next generation: the elite fraction of the best networks as
+        they are, the rest children of tournament selected parents with
+        gaussian noise of sigma on a rate fraction of their weights
+        """
+        n_elite = max(1, int(elite * self.size))
+        elites = np.argsort(-fitness, kind="stable")[:n_elite]
+        contenders = self.rng.integers(self.size,
+                                       size=(self.size - n_elite, tournament))
+        parents = contenders[np.arange(len(contenders)),
+                             fitness[contenders].argmax(axis=1)]
+        chosen = np.concatenate([elites, parents])
+        for i, conn in enumerate(self.weights):
+            noise = self.rng.standard_normal((len(parents),) + conn.shape[1:])
+            noise *= sigma * (self.rng.random(noise.shape) < rate)
+            new = conn[chosen]
+            new[n_elite:] += noise
+            self.weights[i] = new
+        self.generation += 1
+
+    def ann(self, index):
+        """
+        Network index as an ANN
+        """
+        return ANN([conn[index].copy() for conn in self.weights])
+
+
+class NetAgent(Agent):
+    """
+    Plays a Game with an evolved ANN
+    """
+
+    def __init__(self, ann):
+        self.ann = ann
+
+    def act(self, phase, player):
+        out = self.ann.out_vector(game_features(phase.game, phase, player))
+        bid = int(decide(out, phase.highest_bid, phase.playerfunds(),
+                         phase.BIDDING_STEP))
+        return ("bid", bid) if bid > 0 else PASS
+
+
+if __name__ == "__main__":
+    import functools
+    import time
+    from agents import RandomAgent
+    from tournament import tournament
+    population = Population(60, rng=0)
+    for generation in range(30):
+        start = time.perf_counter()
+        fitness = population.evaluate(processes=4)
+        print(generation, fitness.max(), fitness.mean(),
+              time.perf_counter() - start)
+        population.select(fitness)
+    best = population.ann(int(population.evaluate().argmax()))
+    print(tournament([functools.partial(NetAgent, best), RandomAgent,
+                      RandomAgent], 1000))
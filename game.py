@@ -5,7 +5,47 @@ Created on Wed Apr 15 13:31:01 2015
 @author: Ants Torim
 """
 
-import random
+import functools
+import numpy as np
+
+
+CHECK = ("check", None)
+HIDE = ("hide", None)
+PASS = ("pass", None)
+
+# encode() fields between playerfunds and the checked flags
+PHASE_FIELDS = 10
+
+
+def encodedsize(players, c, areas):
+    """
+    Length of encode() vectors of a game
+    """
+    return (players*areas + 1)*c + 2*players + PHASE_FIELDS
+
+
+class BoardView:
+    """
+    Read only view of an r x c board supporting board[r][c] and
+    board[r, c] for boards that are not matrices. cell(r, c) tells
+    if row r owns ability c.
+    """
+
+    def __init__(self, cell, r, c):
+        self.cell = cell
+        self.r = r
+        self.c = c
+
+    def __len__(self):
+        return self.r
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return int(self.cell(*key))
+        return [int(self.cell(key, c)) for c in range(self.c)]
+
+    def __repr__(self):
+        return repr([self[r] for r in range(self.r)])
 
 
 class Game:
@@ -19,23 +59,32 @@ class Game:
     phase, player = next(game)
     """    
     
+    profiler = None # see instrument.Profiler
     
-    def __init__(self, players, c=9, areas=3, startfunds=10000):
+    def __init__(self, players, c=9, areas=3, startfunds=10000, rng=None,
+                 auctionstarter=0):
         """
         Initialize game with number of players, c columns 
         and number of areas. Call emptyboard() to create 
         empty board (first row is for the King).
         Call initdecks() to create full area and ability decks 
         (self.areadeck, self.abilitydeck).
+        rng is a seed or numpy Generator for shuffling the decks,
+        None takes fresh entropy from the OS.
+        auctionstarter is the player starting the first auction.
         """
         self.players = players
         self.areas = areas
         self.r = players*areas + 1
         self.c = c
-        self.auctionstarter = 0
+        self.rng = np.random.default_rng(rng)
+        self.auctionstarter = auctionstarter
+        self.hash = 0
         self.emptyboard()
         self.initdecks()
         self.playerfunds = [startfunds] * self.players
+        for player in range(self.players):
+            self.hash ^= fundkey(player, startfunds)
         self.currentphase = AuctionPhase(self)
         self.winamount = c + c // 2 + 1
     
@@ -45,6 +94,15 @@ class Game:
         Generator that yields (phase, player) tuples until game ends. 
         Player actions should be carried out on those phases.
         Previous phases are finalized with default actions, if needed.
+        If self.profiler is set, iteration goes through its iterate().
+        """
+        if self.profiler != None:
+            return self.profiler.iterate(self)
+        return self.play()
+
+    def play(self):
+        """
+        The generator of __iter__() without profiling
         """
         while self.winner() == None:
             phase = self.currentphase 
@@ -65,9 +123,25 @@ class Game:
     
     def set(self, r, c, val=1):
         """
-        Sets r, c to val on board
+        Sets r, c to val on board.
+        Implementations call hashcell() when the value changes.
         """
         raise NotImplementedError
+
+    def hashcell(self, r, c, old, val):
+        """
+        Updates hash for r, c changing from old to val.
+        Hash only tells apart empty and owned cells.
+        """
+        if bool(old) != bool(val):
+            self.hash ^= zobristkeys(self.r, self.c)[r][c]
+
+    def boardvector(self):
+        """
+        Board as a flat int array of length r*c
+        """
+        return np.array([[self.board[r][c] for c in range(self.c)]
+                         for r in range(self.r)], dtype=np.int64).ravel()
         
     def colfreqs(self):
         """
@@ -80,10 +154,30 @@ class Game:
 
         
     def initdecks(self):
-        self.areadeck = list(range(self.areas+1)) * self.c
-        self.abilitydeck = list(range(self.c)) * (self.areas+1)
-        random.shuffle(self.areadeck)
-        random.shuffle(self.abilitydeck)
+        """
+        Shuffled decks are arrays that are never changed, cards are
+        drawn by moving the cursors areapos and abilitypos.
+        """
+        self.areadeck, self.abilitydeck = makedecks(self.rng, self.c,
+                                                    self.areas)
+        self.areapos = 0
+        self.abilitypos = 0
+
+    def decksizes(self):
+        """
+        Returns numbers of cards left in area and ability decks
+        """
+        return (len(self.areadeck) - self.areapos,
+                len(self.abilitydeck) - self.abilitypos)
+
+    def deckstate(self):
+        """
+        Snapshot of the decks for setdeckstate()
+        """
+        return self.areapos, self.abilitypos
+
+    def setdeckstate(self, state):
+        self.areapos, self.abilitypos = state
         
     def find_row(self, player, area):
         """
@@ -121,29 +215,38 @@ class Game:
         """
         Returns hidden area code
         """
-        return self.areadeck[0]
+        return int(self.areadeck[self.areapos])
         
     def poparea(self): 
         """
         Returns hidden area code and replaces hiddenarea with new 
         """
-        result = self.areadeck[0]
-        del self.areadeck[0]
+        result = self.hiddenarea()
+        self.areapos += 1
         return result
         
     def hiddenability(self): 
         """
         Returns hidden area code
         """
-        return self.abilitydeck[0]
+        return int(self.abilitydeck[self.abilitypos])
         
     def popability(self): 
         """
         Returns hidden area code and replaces hiddenarea with new 
         """
-        result = self.abilitydeck[0]
-        del self.abilitydeck[0]
+        result = self.hiddenability()
+        self.abilitypos += 1
         return result
+
+    def unpop(self, area, ability):
+        """
+        Puts area and ability back on top of the decks
+        """
+        self.areapos -= 1
+        self.abilitypos -= 1
+        assert self.hiddenarea() == area
+        assert self.hiddenability() == ability
               
     def buy(self, player):
         """
@@ -178,20 +281,200 @@ class Game:
             self.auctionstarter = (self.auctionstarter + 1) % self.players
             self.currentphase = AuctionPhase(self)
         
-    def winner(self):
+    def make(self, action):
+        """
+        Carries out action of the active player in the current auction
+        (see AuctionPhase.act) and returns an undo record for unmake().
+        If the action ends the auction and the game goes on, moves to the
+        next auction through payday like iteration does.
+        """
+        phase = self.currentphase
+        assert phase.type == "auction" and phase.active
+        step = phase.steps[-1]
+        if action[0] == "bid":
+            bidder = phase.activeplayer
+        else:
+            bidder = phase.highest_bidder
+        owned = None
+        if bidder != None:
+            owned = self.has(bidder, phase.area, phase.item)
+        undo = (phase, list(self.playerfunds), self.hash,
+                self.auctionstarter, owned,
+                phase.activeplayer, phase.highest_bid, phase.highest_bidder,
+                phase.hidden, len(phase.checked), len(phase.steps),
+                step.checked, step.hid, step.bid)
+        phase.act(action)
+        if not phase.active and not self.winner():
+            self.nextphase()
+            if self.winner() == None:
+                self.nextphase()
+        return undo
+
+    def unmake(self, undo):
+        """
+        Restores the game to the state before make() returned undo.
+        Undo records must be unmade in reverse order.
+        """
+        (phase, funds, hashed, starter, owned, activeplayer, highest_bid,
+         highest_bidder, hidden, n_checked, n_steps,
+         checked, hid, bid) = undo
+        if not phase.active:
+            if phase.winner != None:
+                self.setforplayer(phase.winner, phase.area, phase.item, owned)
+            self.unpop(phase.area, phase.item)
+            phase.active = True
+            phase.winner = None
+        self.currentphase = phase
+        self.playerfunds = funds
+        self.hash = hashed
+        self.auctionstarter = starter
+        phase.activeplayer = activeplayer
+        phase.highest_bid = highest_bid
+        phase.highest_bidder = highest_bidder
+        phase.hidden = hidden
+        del phase.checked[n_checked:]
+        del phase.steps[n_steps:]
+        step = phase.steps[-1]
+        step.checked = checked
+        step.hid = hid
+        step.bid = bid
+
+    def addfunds(self, player, amount):
+        """
+        Adds amount (negative to deduct) to player's funds
+        """
+        funds = self.playerfunds[player]
+        self.hash ^= fundkey(player, funds) ^ fundkey(player, funds + amount)
+        self.playerfunds[player] = funds + amount
+
+    def zobrist(self):
+        """
+        Recomputes from scratch the hash that set() and addfunds()
+        keep up to date in self.hash
+        """
+        result = 0
+        keys = zobristkeys(self.r, self.c)
+        for i in np.flatnonzero(self.boardvector()):
+            result ^= keys[i // self.c][i % self.c]
+        for player, funds in enumerate(self.playerfunds):
+            result ^= fundkey(player, funds)
+        return result
+
+    def statehash(self):
+        """
+        Hash of the public state: self.hash combined with phase fields
         """
-        If game has ended returns the winner, else None
+        phase = self.currentphase
+        if phase.type == "payday":
+            return hash((self.hash, self.auctionstarter, self.areapos))
+        return hash((self.hash, self.auctionstarter, self.areapos,
+                     phase.item, phase.active, phase.activeplayer,
+                     phase.highest_bid, phase.highest_bidder, phase.hidden,
+                     frozenset(phase.checked)))
+
+    def encodedsize(self):
+        return encodedsize(self.players, self.c, self.areas)
+
+    def encode(self, out=None):
+        """
+        Public state as an int64 vector of length encodedsize():
+        board (r*c), playerfunds, areapos, abilitypos, auctionstarter,
+        then phase fields: type (0 auction, 1 payday), active,
+        activeplayer, highest_bid, highest_bidder, hidden, item and a
+        checked flag per player. None is -1. Writes into out if given.
+        Step history and the decks are not encoded.
+        """
+        if out is None:
+            out = np.empty(self.encodedsize(), dtype=np.int64)
+        n = self.r*self.c
+        out[:n] = self.boardvector()
+        out[n:n+self.players] = self.playerfunds
+        n += self.players
+        phase = self.currentphase
+        m = n + PHASE_FIELDS
+        if phase.type == "auction":
+            out[n:m] = (self.areapos, self.abilitypos, self.auctionstarter,
+                        0, phase.active, phase.activeplayer,
+                        phase.highest_bid, nonetominus(phase.highest_bidder),
+                        phase.hidden, phase.item)
+            out[m:] = 0
+            out[m:][phase.checked] = 1
+        else:
+            out[n:m] = (self.areapos, self.abilitypos, self.auctionstarter,
+                        1, 0, -1, 0, -1, 0, -1)
+            out[m:] = 0
+        return out
+
+    def statekey(self):
+        """
+        Bytes of encode(), usable as a dict key
+        """
+        return self.encode().tobytes()
+
+    def decode(self, vector):
+        """
+        Sets the public state from an encode() vector. Decks stay,
+        only their cursors are set. The step history of a decoded
+        auction has just the active player's step.
+        """
+        n = self.r*self.c
+        for i in np.flatnonzero(vector[:n] != self.boardvector()).tolist():
+            self.set(i // self.c, i % self.c, int(vector[i]))
+        for player in range(self.players):
+            self.addfunds(player,
+                          int(vector[n+player]) - self.playerfunds[player])
+        n += self.players
+        m = n + PHASE_FIELDS
+        (self.areapos, self.abilitypos, self.auctionstarter, phasetype,
+         active, activeplayer, highest_bid, highest_bidder,
+         hidden, item) = [int(x) for x in vector[n:m]]
+        if phasetype == 1:
+            self.currentphase = PaydayPhase(self, pay=False)
+            return
+        phase = AuctionPhase(self, drawn=not active)
+        if not active:
+            phase.winner = minustonone(highest_bidder)
+        phase.item = item
+        phase.active = bool(active)
+        phase.activeplayer = activeplayer
+        phase.highest_bid = highest_bid
+        phase.highest_bidder = minustonone(highest_bidder)
+        phase.hidden = bool(hidden)
+        phase.checked = np.flatnonzero(vector[m:]).tolist()
+        phase.steps = [AuctionStep(activeplayer, 
+                                   checked=activeplayer in phase.checked)]
+        self.currentphase = phase
+
+    def leader(self):
+        """
+        Returns (row, weight) for the row with the highest weight.
+        On ties the lowest row leads.
         """
         max_weight = -1
-        max_player = None
-        for i in range(len(self.rowweights())):
-            w = self.rowweights()[i]
+        max_row = None
+        for i, w in enumerate(self.rowweights()):
             if w > max_weight:
                 max_weight = w
-                max_player = i
+                max_row = i
+        return max_row, max_weight
+
+    def winner(self):
+        """
+        If game has ended returns the winner, else None.
+        Calls are timed by self.profiler if set.
+        """
+        if self.profiler != None:
+            return self.profiler.winner(self)
+        return self.checkwinner()
+
+    def checkwinner(self):
+        """
+        winner() without profiling
+        """
+        max_player, max_weight = self.leader()
         if max_weight >= self.winamount:
             return max_player
-        elif len(self.abilitydeck)==0 or len(self.areadeck)==0:
+        elif 0 in self.decksizes():
             return max_player
         else:
             return None
@@ -201,12 +484,12 @@ class Game:
         board_desc = ".  ".join([str(x) for x in range(self.c)])
         board_desc = "   \t[ " + board_desc +  ".]\n\n"
         row_template = "{0}:\t{1}    {2}  \n"
-        board_desc += row_template.format("K", self.board[0],
-                                          self.rowweights()[0])
+        weights = self.rowweights()
+        board_desc += row_template.format("K", self.board[0], weights[0])
         for i in range(1, len(self.board)):
             player, _ = self.rowinfo(i)
             board_desc += row_template.format(player, self.board[i],
-                                              self.rowweights()[i])
+                                              weights[i])
         board_desc += "\nC:\t" + str(self.colfreqs()) + "\n"
         
         # Build monetary description
@@ -219,12 +502,57 @@ class Game:
             money_desc, repr(self.currentphase))
         
         
+@functools.lru_cache()
+def zobristkeys(r, c):
+    """
+    Random 64 bit keys for board cells, the same for every r x c game
+    """
+    rng = np.random.default_rng([r, c])
+    keys = rng.integers(0, 2**63, size=(r, c), dtype=np.int64)
+    return keys.tolist()
+
+
+def fundkey(player, funds):
+    """
+    64 bit hash key of player having funds (splitmix64 finalizer)
+    """
+    x = (player << 40 ^ funds) & 0xFFFFFFFFFFFFFFFF
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & 0xFFFFFFFFFFFFFFFF
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & 0xFFFFFFFFFFFFFFFF
+    return x ^ (x >> 31)
+
+
+def nonetominus(x):
+    return -1 if x == None else x
+
+
+def minustonone(x):
+    return None if x == -1 else x
+
+
+def makedecks(rng, c, areas):
+    """
+    Returns shuffled area and ability decks as arrays.
+    Area deck has c cards of each area 0..areas (0 is the King),
+    ability deck has areas+1 cards of each ability 0..c-1.
+    """
+    areadeck = np.tile(np.arange(areas+1), c)
+    abilitydeck = np.tile(np.arange(c), areas+1)
+    rng.shuffle(areadeck)
+    rng.shuffle(abilitydeck)
+    return areadeck, abilitydeck
+
+
 class AuctionPhase:
     """
     One auction phase
     """
     
-    def __init__(self, game):
+    def __init__(self, game, drawn=False):
+        """
+        drawn tells that the cards of the auction were already drawn,
+        as in a finished auction, so they are just behind the cursors
+        """
         self.activeplayer = game.auctionstarter
         self.game = game
         self.CHECK_COST = 1000
@@ -236,8 +564,12 @@ class AuctionPhase:
         self.highest_bid = 0
         self.highest_bidder = None
         self.active = True # If phase is active
-        self.item = game.hiddenability()
-        self.area = game.hiddenarea()
+        if drawn:
+            self.item = int(game.abilitydeck[game.abilitypos-1])
+            self.area = int(game.areadeck[game.areapos-1])
+        else:
+            self.item = game.hiddenability()
+            self.area = game.hiddenarea()
         self.type = "auction"
         self.steps = [AuctionStep(self.activeplayer)] # step history
 
@@ -279,9 +611,27 @@ class AuctionPhase:
         self.steps[-1].bid = None
         self.nextplayer()
 
+    def act(self, action):
+        """
+        Carries out action, a (kind, amount) tuple:
+        ("check", None), ("hide", None), ("bid", bidsum) or ("pass", None).
+        Returns the hidden area for check, else None.
+        """
+        kind, amount = action
+        if kind == "check":
+            return self.check()
+        elif kind == "hide":
+            self.hide()
+        elif kind == "bid":
+            self.bid(amount)
+        elif kind == "pass":
+            self.pass_bid()
+        else:
+            raise ValueError("Unknown action: " + repr(action))
+
     def finalize_for(self, player):
         "If player is activeplayer then pass bid, and move to next player"
-        if player == self.activeplayer:
+        if self.active and player == self.activeplayer:
             self.pass_bid()
         
  # -------------- Internal methods ------------------------------------
@@ -292,7 +642,7 @@ class AuctionPhase:
     def deduct(self, amount, player=None):
         if player == None:
             player = self.activeplayer
-        self.game.playerfunds[player] -= amount
+        self.game.addfunds(player, -amount)
 
      
     def nextplayer(self):
@@ -350,6 +700,7 @@ class AuctionStep:
     bid (None if passed)
     """
     
+    __slots__ = ("player", "checked", "hid", "bid")
     
     def __init__(self, player, checked=False, hid=False, bid=None):
         self.player = player
@@ -357,8 +708,11 @@ class AuctionStep:
         self.hid = hid
         self.bid = bid      
       
+    def fields(self):
+        return (self.player, self.checked, self.hid, self.bid)
+
     def __eq__(self,other):
-        return self.__dict__ == other.__dict__
+        return self.fields() == other.fields()
         
     def __ne__(self, other):
         return not self == other
@@ -382,12 +736,14 @@ class AuctionStep:
 
 class PaydayPhase:
     
-    def __init__(self, game):
+    def __init__(self, game, pay=True):
         self.activeplayer = None
         self.game = game
         self.type = "payday"
         self.PAY = 2000
-        game.playerfunds = [x + self.PAY for x in game.playerfunds]
+        if pay:
+            for player in range(game.players):
+                game.addfunds(player, self.PAY)
         self.active = False
         
     def finalize_for(self, player): pass
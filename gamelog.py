@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Append-only columnar log of auction steps.
+
+A log is a directory with one binary file per column. Every auction
+step is one row: game and phase (auction number) ids, the AuctionStep
+fields and the item, area and winner of its auction. None is stored
+as -1. Columns are read back as read-only memory maps, so whole logs
+can be scanned with numpy without building Python objects.
+"""
+
+import os
+import numpy as np
+from game import AuctionStep
+
+VERSION = 1
+
+COLUMNS = [("game", np.dtype("<i8")),
+           ("phase", np.dtype("<i4")),
+           ("player", np.dtype("<i2")),
+           ("checked", np.dtype("?")),
+           ("hid", np.dtype("?")),
+           ("bid", np.dtype("<i8")),
+           ("item", np.dtype("<i2")),
+           ("area", np.dtype("<i2")),
+           ("winner", np.dtype("<i2"))]
+
+
+class StepLog:
+    """
+    Log in directory path. Appended steps are buffered and written out
+    every buffer_size steps, on flush() and on close().
+
+    log = StepLog("steps")
+    log.append_phase(game_id, game.areapos - 1, phase)
+    log.close()
+    bids = StepLog("steps")["bid"]
+    """
+
+    def __init__(self, path, buffer_size=65536):
+        self.path = path
+        self.buffer_size = buffer_size
+        os.makedirs(path, exist_ok=True)
+        version_path = os.path.join(path, "VERSION")
+        if os.path.exists(version_path):
+            with open(version_path) as f:
+                version = int(f.read())
+            if version != VERSION:
+                raise ValueError("Unsupported step log version " +
+                                 str(version))
+            self.truncate()
+        else:
+            with open(version_path, "w") as f:
+                f.write(str(VERSION))
+        self.buffers = {name: [] for name, _ in COLUMNS}
+
+    def columnpath(self, name):
+        return os.path.join(self.path, name + ".bin")
+
+    def truncate(self):
+        """
+        Cuts the columns to the same length, dropping the rows that
+        only some columns got before a crash
+        """
+        n = len(self)
+        for name, dtype in COLUMNS:
+            path = self.columnpath(name)
+            if os.path.exists(path) and \
+                    os.path.getsize(path) > n * dtype.itemsize:
+                os.truncate(path, n * dtype.itemsize)
+
+    def append(self, game, phase, step, item, area, winner):
+        """
+        Appends one AuctionStep of auction phase of game
+        """
+        row = (game, phase, step.player, step.checked, step.hid,
+               -1 if step.bid == None else step.bid, item, area,
+               -1 if winner == None else winner)
+        for (name, _), value in zip(COLUMNS, row):
+            self.buffers[name].append(value)
+        if len(self.buffers["game"]) >= self.buffer_size:
+            self.flush()
+
+    def append_phase(self, game, phase, auction):
+        """
+        Appends all steps of a finished AuctionPhase auction
+        """
+        for step in auction.steps:
+            self.append(game, phase, step, auction.item, auction.area,
+                        auction.winner)
+
+    def flush(self):
+        if not self.buffers["game"]:
+            return
+        for name, dtype in COLUMNS:
+            with open(self.columnpath(name), "ab") as f:
+                f.write(np.array(self.buffers[name], dtype).tobytes())
+            self.buffers[name] = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        """
+        Number of written steps. A crash between column writes
+        leaves longer columns, their extra rows are ignored and cut
+        off when the log is opened again.
+        """
+        lengths = []
+        for name, dtype in COLUMNS:
+            path = self.columnpath(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            lengths.append(size // dtype.itemsize)
+        return min(lengths)
+
+    def __getitem__(self, name):
+        """
+        Written column name as a read-only memory map
+        """
+        dtype = dict(COLUMNS)[name]
+        n = len(self)
+        if n == 0:
+            return np.zeros(0, dtype)
+        return np.memmap(self.columnpath(name), dtype, mode="r", shape=(n,))
+
+    def columns(self):
+        return {name: self[name] for name, _ in COLUMNS}
+
+    def steps(self, start=0, stop=None, chunk=65536):
+        """
+        Generator of (game, phase, AuctionStep) for written rows
+        start..stop, reading the columns chunk rows at a time
+        """
+        columns = self.columns()
+        if stop == None:
+            stop = len(self)
+        for begin in range(start, stop, chunk):
+            end = min(begin + chunk, stop)
+            rows = zip(*[columns[name][begin:end].tolist()
+                         for name, _ in COLUMNS])
+            for game, phase, player, checked, hid, bid, _, _, _ in rows:
+                yield game, phase, AuctionStep(player, checked, hid,
+                                               None if bid == -1 else bid)
+
+    def phases(self):
+        """
+        Row ranges (start, stop) of every logged auction, in log order
+        """
+        games = self["game"]
+        phases = self["phase"]
+        if len(games) == 0:
+            return []
+        changes = np.flatnonzero((games[1:] != games[:-1]) |
+                                 (phases[1:] != phases[:-1])) + 1
+        bounds = [0] + changes.tolist() + [len(games)]
+        return list(zip(bounds[:-1], bounds[1:]))
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Profiling of game iteration.
+
+Game.__iter__ only checks once per game whether game.profiler is set,
+so games without a profiler run the plain loop of Game.play() at no
+extra cost. With a profiler the loop is the same Game.play() timed
+between its yields, and every winner() call is counted and timed.
+
+profiler = Profiler(trace="trace.jsonl", sample=0.01)
+for i in range(100):
+    game = NumGame(3)
+    game.profiler = profiler
+    for phase, player in game:
+        ...
+print(profiler.summary())
+profiler.close()
+
+Agent time is the time the game waits between yield and resume,
+rules time the rest of the loop, finalize_for() and nextphase().
+Termination time is all winner() calls, by the loop, make() and the
+agents, so it may overlap with agent time.
+"""
+
+import json
+import random
+import time
+
+
+ACTIONS = ("check", "hide", "bid", "pass")
+
+
+class Profiler:
+    """
+    Counters and timings over all games iterated with it.
+    If trace (a path or file) is given, a sample fraction of yields is
+    written there as JSON lines. Deep copies of a game share its
+    profiler.
+    """
+
+    def __init__(self, trace=None, sample=0.01, seed=0,
+                 clock=time.perf_counter):
+        self.clock = clock
+        self.sample = sample
+        self.rng = random.Random(seed)
+        self.owned = isinstance(trace, str)
+        self.trace = open(trace, "w") if self.owned else trace
+        self.games = 0
+        self.phases = {"auction": 0, "payday": 0}
+        self.agent_time = {"auction": 0.0, "payday": 0.0}
+        self.rules_time = 0.0
+        self.termination_time = 0.0
+        self.winner_calls = 0
+        self.actions = dict.fromkeys(ACTIONS, 0)
+        self.action_time = {"bid": 0.0, "pass": 0.0}
+        self.cards = 0
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def winner(self, game):
+        start = self.clock()
+        winner = game.checkwinner()
+        self.termination_time += self.clock() - start
+        self.winner_calls += 1
+        return winner
+
+    def iterate(self, game):
+        """
+        game.play() with measurements
+        """
+        clock = self.clock
+        self.games += 1
+        game_id = self.games
+        startpos = game.areapos
+        plain = game.play()
+        seen = None
+        last = None # (phase, player, step, agent time) of the last yield
+        while True:
+            start = clock()
+            checking = self.termination_time
+            current = next(plain, None)
+            rules = clock() - start
+            self.rules_time += rules - (self.termination_time - checking)
+            if last != None:
+                self.record(game, game_id, *last, rules)
+            if current == None:
+                break
+            phase, player = current
+            if phase is not seen:
+                self.phases[phase.type] += 1
+                seen = phase
+            step = len(phase.steps) - 1 if phase.type == "auction" else None
+            start = clock()
+            yield phase, player
+            last = (phase, player, step, clock() - start)
+        self.cards += game.areapos - startpos
+
+    def record(self, game, game_id, phase, player, step, waited, rules):
+        """
+        Counts and traces one yield of game
+        """
+        self.agent_time[phase.type] += waited
+        action = None
+        if step != None and step < len(phase.steps):
+            action = self.count(phase.steps[step], waited)
+        if self.trace != None and self.rng.random() < self.sample:
+            self.trace.write(json.dumps({
+                "game": game_id, "phase": phase.type, "player": player,
+                "action": action, "agent": waited, "rules": rules,
+                "areapos": game.areapos}) + "\n")
+
+    def count(self, step, seconds):
+        """
+        Counts the actions of a finished AuctionStep, returns
+        the bid or pass that ended it
+        """
+        if step.checked:
+            self.actions["check"] += 1
+        if step.hid:
+            self.actions["hide"] += 1
+        action = "pass" if step.bid == None else "bid"
+        self.actions[action] += 1
+        self.action_time[action] += seconds
+        return action
+
+    def summary(self):
+        """
+        Totals as a dict
+        """
+        return {"games": self.games,
+                "phases": dict(self.phases),
+                "agent_time": dict(self.agent_time),
+                "rules_time": self.rules_time,
+                "termination_time": self.termination_time,
+                "winner_calls": self.winner_calls,
+                "actions": dict(self.actions),
+                "action_time": dict(self.action_time),
+                "cards": self.cards,
+                "cards_per_game": self.cards / max(self.games, 1)}
+
+    def close(self):
+        if self.owned and not self.trace.closed:
+            self.trace.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+if __name__ == "__main__":
+    from numgame import NumGame
+    from agents import RandomAgent, play_step
+    with Profiler() as profiler:
+        agent = RandomAgent()
+        for i in range(200):
+            game = NumGame(3)
+            game.profiler = profiler
+            for phase, player in game:
+                if phase.type == "auction":
+                    play_step(agent, phase, player)
+        print(json.dumps(profiler.summary(), indent=1))
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Information set Monte Carlo tree search (single observer ISMCTS).
+
+Every iteration deals the cards the searching player has not seen into
+a determinized copy of the game, then walks the shared tree with UCB,
+expands one node, plays a random rollout and backs up who won. Nodes
+are reached by actions only, so one tree covers all determinizations.
+"""
+
+import copy
+import math
+import multiprocessing
+import time
+import numpy as np
+from game import CHECK, HIDE, PASS
+from agents import Agent, legal_actions
+from belief import BeliefTracker
+
+
+class Node:
+    """
+    Search tree node reached by player doing action in parent.
+    reward counts wins of player in iterations through the node,
+    avail counts iterations in which action was legal.
+    """
+
+    def __init__(self, parent=None, action=None, player=None):
+        self.parent = parent
+        self.action = action
+        self.player = player
+        self.children = {}
+        self.visits = 0
+        self.avail = 0
+        self.reward = 0.0
+
+    def ucb(self, exploration):
+        return (self.reward / self.visits +
+                exploration * math.sqrt(math.log(self.avail) / self.visits))
+
+    def stats(self):
+        """
+        {action: (visits, reward)} for the children
+        """
+        return {action: (child.visits, child.reward)
+                for action, child in self.children.items()}
+
+
+def winning_player(game):
+    """
+    Player owning the winning row, None if the King won
+    """
+    player, _ = game.rowinfo(game.winner())
+    return player
+
+
+def step_actions(phase, start=0, checked=False, hid=False):
+    """
+    Actions taken in phase from step start on, as check, hide, bid or
+    pass in that order. checked and hid tell which parts of step start
+    were already done before.
+    """
+    actions = []
+    last = len(phase.steps) - 1
+    for i in range(start, last + 1):
+        step = phase.steps[i]
+        if step.checked and not (i == start and checked):
+            actions.append(CHECK)
+        if step.hid and not (i == start and hid):
+            actions.append(HIDE)
+        if i < last or not phase.active:
+            actions.append(PASS if step.bid == None else ("bid", step.bid))
+    return actions
+
+
+class ISMCTSAgent(Agent):
+    """
+    Searches for iterations or time_limit seconds, whichever runs out
+    first (None for no limit). Bids considered are raises times
+    BIDDING_STEP over the highest bid. Rollouts bid the minimum with
+    probability rollout_bidprob.
+
+    The subtree of the actions played since the last move is kept as
+    the next root. With processes > 1 the extra processes search
+    independent trees and their root statistics are added up.
+    Call close() to stop the worker processes.
+    """
+
+    def __init__(self, iterations=1000, time_limit=None, raises=(1, 2),
+                 exploration=0.7, rollout_bidprob=0.3, processes=1,
+                 reuse=True, rng=None):
+        assert iterations != None or time_limit != None
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.raises = raises
+        self.exploration = exploration
+        self.rollout_bidprob = rollout_bidprob
+        self.processes = processes
+        self.reuse = reuse
+        self.rng = np.random.default_rng(rng)
+        self.pool = None
+        self.game = None
+
+    def act(self, phase, player):
+        game = phase.game
+        if game is not self.game:
+            self.newgame(game)
+        self.observe(phase, player)
+        root = self.reusedroot(game)
+        jobs = self.startworkers(game, player)
+        self.search(game, player, root)
+        stats = root.stats()
+        for result in jobs:
+            for action, (visits, reward) in result.get().items():
+                old_visits, old_reward = stats.get(action, (0, 0.0))
+                stats[action] = (old_visits + visits, old_reward + reward)
+        actions = legal_actions(phase, self.raises)
+        action = max(actions, key=lambda a: stats.get(a, (0, 0.0)))
+        self.remember(phase, root)
+        return action
+
+# ---------- Observations ----------------------------------------
+
+    def newgame(self, game):
+        self.game = game
+        self.belief = BeliefTracker(game)
+        self.root = None
+        self.rootphase = None
+
+    def observe(self, phase, player):
+        """
+        Updates the belief with the cards the player has seen
+        """
+        self.belief.observe(phase.game, player)
+
+# ---------- Tree reuse ------------------------------------------
+
+    def remember(self, phase, root):
+        step = phase.steps[-1]
+        self.root = root
+        self.rootphase = phase
+        self.rootmark = (len(phase.steps) - 1, step.checked, step.hid)
+        self.rootareapos = phase.game.areapos
+
+    def reusedroot(self, game):
+        """
+        Subtree for the actions played since the last search,
+        a new root if there is none.
+        """
+        if not self.reuse or self.root == None:
+            return Node()
+        phase = game.currentphase
+        actions = step_actions(self.rootphase, *self.rootmark)
+        if phase is not self.rootphase:
+            if game.areapos != self.rootareapos + 1:
+                return Node()
+            actions += step_actions(phase)
+        node = self.root
+        for action in actions:
+            if action not in node.children:
+                return Node()
+            node = node.children[action]
+        node.parent = None
+        return node
+
+# ---------- Search ----------------------------------------------
+
+    def search(self, game, player, root):
+        game = copy.deepcopy(game)
+        self.prepare(game)
+        deadline = None
+        if self.time_limit != None:
+            deadline = time.perf_counter() + self.time_limit
+        i = 0
+        while self.iterations == None or i < self.iterations:
+            if deadline != None and time.perf_counter() >= deadline:
+                break
+            self.iterate(game, root)
+            i += 1
+        return root
+
+    def prepare(self, game):
+        """
+        Unseen cards for determinizing game
+        """
+        self.unseenareas = self.belief.unseen_areas()
+        self.areastart = game.areapos
+        if self.belief.known != None:
+            self.areastart += 1
+        self.unseenabilities = self.belief.unseen_abilities()
+
+    def determinize(self, game):
+        """
+        Deals unseen cards to the undrawn part of the decks.
+        The current item is public, the current area is dealt unless seen.
+        """
+        needed = len(game.areadeck) - self.areastart
+        game.areadeck[self.areastart:] = \
+            self.rng.permutation(self.unseenareas)[:needed]
+        game.abilitydeck[game.abilitypos+1:] = \
+            self.rng.permutation(self.unseenabilities)
+        game.currentphase.area = game.hiddenarea()
+
+    def iterate(self, game, root):
+        self.determinize(game)
+        node = root
+        undos = []
+        # Selection and expansion
+        while game.winner() == None:
+            phase = game.currentphase
+            actions = legal_actions(phase, self.raises)
+            untried = []
+            for action in actions:
+                child = node.children.get(action)
+                if child == None:
+                    untried.append(action)
+                else:
+                    child.avail += 1
+            if untried:
+                action = untried[self.rng.integers(len(untried))]
+                child = Node(node, action, phase.activeplayer)
+                child.avail = 1
+                node.children[action] = child
+                undos.append(game.make(action))
+                node = child
+                break
+            node = max((node.children[a] for a in actions),
+                       key=lambda child: child.ucb(self.exploration))
+            undos.append(game.make(node.action))
+        # Rollout
+        while game.winner() == None:
+            phase = game.currentphase
+            bid = phase.highest_bid + phase.BIDDING_STEP
+            if (self.rng.random() < self.rollout_bidprob and
+                    phase.playerfunds() >= bid):
+                undos.append(game.make(("bid", bid)))
+            else:
+                undos.append(game.make(PASS))
+        winner = winning_player(game)
+        while node != None:
+            node.visits += 1
+            if node.player == winner and winner != None:
+                node.reward += 1
+            node = node.parent
+        for undo in reversed(undos):
+            game.unmake(undo)
+
+# ---------- Root parallelism ------------------------------------
+
+    def startworkers(self, game, player):
+        if self.processes <= 1:
+            return []
+        if self.pool == None:
+            self.pool = multiprocessing.Pool(self.processes - 1)
+        settings = dict(iterations=self.iterations,
+                        time_limit=self.time_limit, raises=self.raises,
+                        exploration=self.exploration,
+                        rollout_bidprob=self.rollout_bidprob)
+        seeds = self.rng.integers(2**32, size=self.processes - 1)
+        return [self.pool.apply_async(searchworker,
+                                      (game, player, self.belief, settings,
+                                       seed))
+                for seed in seeds]
+
+    def close(self):
+        if self.pool != None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["pool"] = None
+        return state
+
+
+def searchworker(game, player, belief, settings, seed):
+    """
+    Independent search in a worker process, returns root statistics
+    """
+    agent = ISMCTSAgent(rng=seed, **settings)
+    agent.newgame(game)
+    agent.belief = belief
+    return agent.search(game, player, Node()).stats()
+
+
+if __name__ == "__main__":
+    from numgame import NumGame
+    from agents import RandomAgent, play_step
+    wins = [0, 0, 0]
+    for seed in range(10):
+        game = NumGame(2, rng=seed)
+        agents = [ISMCTSAgent(iterations=200, rng=seed), RandomAgent(rng=seed)]
+        for phase, player in game:
+            if phase.type == "auction":
+                play_step(agents[player], phase, player)
+        player = winning_player(game)
+        wins[2 if player == None else player] += 1
+    print("ISMCTS, random, King:", wins)
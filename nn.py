@@ -4,11 +4,24 @@ Created on Wed Jun 17 19:59:27 2015
 
 @author: Ants Torim
 """
+import os
+import struct
+import tempfile
 import numpy as np
 from numpy.random import rand
 from scipy.special import expit as sigmoid
 
 
+# Weight file: MAGIC, then version, number of layers and dtype code as
+# little endian uint32, then rows and columns of every layer as uint64.
+# Layer data follows in C order, every layer starting at a multiple
+# of ALIGN bytes.
+MAGIC = b"ANNW"
+VERSION = 1
+ALIGN = 64
+DTYPES = {0: np.dtype("<f8"), 1: np.dtype("<f4")}
+
+
 def sigmoid_delta(a):
     """
     Derviative of sigmoid applied to the vector a
@@ -32,9 +45,11 @@ class ANN:
     
     def __init__(self, conn_list):
         """
-        conn_list is a list of weight matrices
+        conn_list is a list of weight matrices. version counts the
+        training steps that changed them in place.
         """
         self.conn_list = conn_list
+        self.version = 0
 
 
     @classmethod
@@ -94,12 +109,189 @@ class ANN:
             #print(weight_matrix)
             weight_matrix += delta_w
             #print(weight_matrix)
-        
-        
-        
-        
-        
-        
+        self.version += 1
+
+    def save(self, path):
+        """
+        Writes conn_list to path atomically, see save_conn_list()
+        """
+        save_conn_list(path, self.conn_list)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Alternate constructor from a file written by save().
+        With mmap the weights are read only views of the file that
+        processes loading the same file share; use mmap=False for
+        a private copy that can be trained.
+        """
+        return cls(load_conn_list(path, mmap))
+
+    def compiled(self, dtype=np.float64):
+        """
+        CompiledANN for fast inference with the current weights
+        """
+        return CompiledANN(self.conn_list, dtype)
+
+    def layer_matrices(self, in_matrix):
+        """
+        Activations of all layers for examples in rows of in_matrix,
+        starting with in_matrix itself
+        """
+        layers = [in_matrix]
+        for conn in self.conn_list:
+            raw_out = np.dot(layers[-1], conn[:, :-1].T) + conn[:, -1]
+            layers.append(sigmoid(raw_out))
+        return layers
+
+    def train_batch(self, in_matrix, target_matrix, alfa=0.5):
+        """
+        One gradient step on a mini-batch: rows of in_matrix are examples,
+        rows of target_matrix their targets. Gradients are averaged
+        over the batch, so a batch of one is the same as backprop().
+        """
+        in_matrix = np.atleast_2d(in_matrix)
+        layers = self.layer_matrices(in_matrix)
+        diff = layers[-1] - np.atleast_2d(target_matrix)
+        n = len(in_matrix)
+        for in_layer, out_layer, weight_matrix in reversed(
+                list(zip(layers, layers[1:], self.conn_list))):
+            # sigmoid derivative from the stored activations
+            sigma = diff * out_layer * (1.0 - out_layer)
+            diff = np.dot(sigma, weight_matrix[:, :-1])
+            weight_matrix[:, :-1] -= alfa / n * np.dot(sigma.T, in_layer)
+            weight_matrix[:, -1] -= alfa / n * sigma.sum(axis=0)
+        self.version += 1
+
+
+
+def aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def save_conn_list(path, conn_list):
+    """
+    Writes weight matrices to a temporary file next to path and renames
+    it to path, so readers never see a half written checkpoint.
+    """
+    dtype = np.dtype(conn_list[0].dtype).newbyteorder("<")
+    codes = {d: code for code, d in DTYPES.items()}
+    if dtype not in codes:
+        dtype = DTYPES[0]
+    header = MAGIC + struct.pack("<III", VERSION, len(conn_list),
+                                 codes[dtype])
+    for conn in conn_list:
+        header += struct.pack("<QQ", *conn.shape)
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as f:
+            f.write(header)
+            for conn in conn_list:
+                f.write(b"\0" * (aligned(f.tell()) - f.tell()))
+                f.write(np.ascontiguousarray(conn, dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_conn_list(path, mmap=True):
+    """
+    Reads weight matrices written by save_conn_list(), memory mapped
+    read only if mmap is True
+    """
+    with open(path, "rb") as f:
+        start = f.read(16)
+        if len(start) < 16 or start[:4] != MAGIC:
+            raise ValueError(path + " is not an ANN weight file")
+        version, layers, code = struct.unpack("<III", start[4:])
+        if version != VERSION:
+            raise ValueError("Unsupported ANN weight file version " +
+                             str(version))
+        shapes = [struct.unpack("<QQ", f.read(16)) for i in range(layers)]
+    dtype = DTYPES[code]
+    conn_list = []
+    offset = 16 + 16*layers
+    for shape in shapes:
+        offset = aligned(offset)
+        if mmap:
+            conn = np.memmap(path, dtype, mode="r", offset=offset,
+                             shape=shape)
+        else:
+            conn = np.fromfile(path, dtype, count=shape[0]*shape[1],
+                               offset=offset).reshape(shape)
+        conn_list.append(conn)
+        offset += shape[0] * shape[1] * dtype.itemsize
+    return conn_list
+
+
+class CompiledANN:
+    """
+    Inference only copy of conn_list with preallocated layer buffers.
+    Weights and biases are stored apart, so no bias node is appended,
+    and dtype may be np.float32 for speed. out_vector() and out_matrix()
+    return views of internal buffers that the next call overwrites.
+    Call refresh() after the source weights change.
+    """
+
+    def __init__(self, conn_list, dtype=np.float64):
+        self.dtype = dtype
+        self.refresh(conn_list)
+        self.in_buffer = np.empty(self.weights[0].shape[1], dtype)
+        self.buffers = [np.empty(len(bias), dtype) for bias in self.biases]
+        self.batch_size = 0
+
+    def refresh(self, conn_list):
+        """
+        Copies weights from conn_list, shapes must stay the same
+        """
+        self.weights = [np.ascontiguousarray(conn[:, :-1], self.dtype)
+                        for conn in conn_list]
+        # Transposed copies for row-per-example products
+        self.weights_t = [np.ascontiguousarray(w.T) for w in self.weights]
+        self.biases = [np.ascontiguousarray(conn[:, -1], self.dtype)
+                       for conn in conn_list]
+
+    def out_vector(self, in_vector):
+        """
+        Same as ANN.out_vector
+        """
+        layer = self.in_buffer
+        layer[:] = in_vector
+        for weights, bias, buffer in zip(self.weights, self.biases,
+                                         self.buffers):
+            np.dot(weights, layer, out=buffer)
+            buffer += bias
+            sigmoid(buffer, out=buffer)
+            layer = buffer
+        return layer
+
+    def out_matrix(self, in_matrix):
+        """
+        Output rows for the example rows of in_matrix.
+        Buffers grow to the largest batch seen.
+        """
+        n = len(in_matrix)
+        if n > self.batch_size:
+            self.batch_size = n
+            self.in_matrix = np.empty((n, self.in_buffer.shape[0]),
+                                      self.dtype)
+            self.matrices = [np.empty((n, len(bias)), self.dtype)
+                             for bias in self.biases]
+        layer = self.in_matrix[:n]
+        layer[:] = in_matrix
+        for weights_t, bias, matrix in zip(self.weights_t, self.biases,
+                                           self.matrices):
+            out = matrix[:n]
+            np.dot(layer, weights_t, out=out)
+            out += bias
+            sigmoid(out, out=out)
+            layer = out
+        return layer
+
     
 if __name__ == "__main__":
     in_mid = np.array([[0., 0., 0.],
@@ -4,20 +4,49 @@ import numpy as np
 from game import *
 
 class NumGame(Game):
- 
+    """
+    Game with the board as a numpy matrix.
+    
+    Column frequencies, row weights and the leading row are cached and
+    updated by set(), so the board should only be changed through set().
+    """
 
     def emptyboard(self):
         self.board = np.zeros((self.r, self.c))
+        self.freqs = np.zeros(self.c)
+        self.weights = np.zeros(self.r)
+        self.leaderrow = 0
 
     def set(self, r, c, val=1):
+        """
+        Sets r, c to val on board and updates the caches in O(r)
+        """
+        old = self.board[r, c]
+        delta = val - old
+        if delta == 0:
+            return
+        self.hashcell(r, c, old, val)
+        # The King's row counts twice in column frequencies
+        freq_delta = 2*delta if r == 0 else delta
+        # Every row owning column c gains the frequency change...
+        self.weights += self.board[:, c] * freq_delta
         self.board[r, c] = val
+        self.freqs[c] += freq_delta
+        # ...and row r gains or loses the new frequency of c itself
+        self.weights[r] += delta * self.freqs[c]
+        self.leaderrow = int(self.weights.argmax())
    
     def colfreqs(self):
-        return np.dot(np.ones(self.r), self.board) + self.board[0]
+        return self.freqs.copy()
         
     def rowweights(self):
-        substituted = self.board * self.colfreqs()
-        return np.dot(substituted, np.ones(self.c))
+        return self.weights.copy()
+
+    def leader(self):
+        return self.leaderrow, self.weights[self.leaderrow]
+
+    def boardvector(self):
+        return self.board.ravel().astype(np.int64)
 
 
 if __name__ == "__main__":
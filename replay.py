@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Replaying recorded games without agents.
+
+A Replay rebuilds a game from its decks (or the seed that shuffled
+them) and its AuctionSteps by make()ing the recorded actions. Every
+interval actions the position is kept as an encode() vector, so
+seek(k) jumps to the position after k actions by decoding the nearest
+snapshot and making at most interval actions.
+
+replay = Replay(steps, 3, rng=seed)
+for k, game in replay.positions():
+    ...
+game = replay.seek(40)
+
+replay_log() replays every game of a StepLog across a process pool and
+returns their encoded positions as one array. Logs do not store
+seeds, but the logged items and areas are the drawn part of the decks,
+which is all a replay reads.
+"""
+
+import multiprocessing
+import numpy as np
+from game import CHECK, HIDE, PASS, AuctionPhase, AuctionStep
+from numgame import NumGame
+from gamelog import StepLog
+
+
+def logged_actions(steps):
+    """
+    Actions of AuctionSteps as check, hide, bid or pass in that order
+    """
+    actions = []
+    for step in steps:
+        if step.checked:
+            actions.append(CHECK)
+        if step.hid:
+            actions.append(HIDE)
+        actions.append(PASS if step.bid == None else ("bid", step.bid))
+    return actions
+
+
+def complete_deck(drawn, counts):
+    """
+    Deck starting with the drawn cards followed by the rest of a deck
+    with counts[i] cards i, in order
+    """
+    rest = counts - np.bincount(drawn, minlength=len(counts))
+    return np.concatenate((drawn, np.repeat(np.arange(len(counts)), rest)))
+
+
+class Replay:
+    """
+    Replay of the AuctionSteps of a game of players. The game is
+    game_cls(players, **gameargs) with decks replaced by decks if given,
+    so gameargs should have the rng and auctionstarter of the recorded
+    game. game is the replayed position, pos the actions made on it.
+    """
+
+    def __init__(self, steps, players, decks=None, interval=64,
+                 game_cls=NumGame, **gameargs):
+        self.actions = logged_actions(steps)
+        self.interval = interval
+        self.game = game_cls(players, **gameargs)
+        if decks != None:
+            self.game.areadeck, self.game.abilitydeck = (
+                np.asarray(deck) for deck in decks)
+            self.game.currentphase = AuctionPhase(self.game)
+        self.pos = 0
+        self.snapshots = [self.game.encode()]
+
+    def __len__(self):
+        return len(self.actions)
+
+    def forward(self):
+        """
+        Makes the next action
+        """
+        self.game.make(self.actions[self.pos])
+        self.pos += 1
+        if self.pos % self.interval == 0 and \
+                self.pos // self.interval == len(self.snapshots):
+            self.snapshots.append(self.game.encode())
+
+    def seek(self, k):
+        """
+        Position after k actions
+        """
+        if not 0 <= k <= len(self.actions):
+            raise IndexError("No position after " + str(k) + " actions")
+        snapshot = min(k // self.interval, len(self.snapshots) - 1)
+        if k < self.pos or snapshot * self.interval > self.pos:
+            self.game.decode(self.snapshots[snapshot])
+            self.pos = snapshot * self.interval
+        while self.pos < k:
+            self.forward()
+        return self.game
+
+    def positions(self):
+        """
+        Generator of (k, game) for the positions after 0..len(self)
+        actions. game is the same object changing in place.
+        """
+        yield 0, self.seek(0)
+        while self.pos < len(self.actions):
+            self.forward()
+            yield self.pos, self.game
+
+    def encoded(self):
+        """
+        encode() vectors of all positions as a (len(self)+1, size) array
+        """
+        states = np.empty((len(self.actions) + 1, self.game.encodedsize()),
+                          dtype=np.int64)
+        for k, game in self.positions():
+            game.encode(out=states[k])
+        return states
+
+
+def log_replay(columns, start, stop, players, c=9, areas=3, **gameargs):
+    """
+    Replay of the game logged in rows start..stop of StepLog columns
+    """
+    rows = {name: column[start:stop] for name, column in columns.items()}
+    phases = rows["phase"]
+    firsts = np.flatnonzero(np.diff(phases, prepend=-1))
+    # Every auction draws one area and one item, so phase ids are
+    # deck positions
+    areadeck = np.zeros(len(firsts), dtype=int)
+    abilitydeck = np.zeros(len(firsts), dtype=int)
+    areadeck[phases[firsts]] = rows["area"][firsts]
+    abilitydeck[phases[firsts]] = rows["item"][firsts]
+    decks = (complete_deck(areadeck, np.full(areas+1, c)),
+             complete_deck(abilitydeck, np.full(c, areas+1)))
+    steps = [AuctionStep(player, checked, hid, None if bid == -1 else bid)
+             for player, checked, hid, bid in zip(
+                 rows["player"].tolist(), rows["checked"].tolist(),
+                 rows["hid"].tolist(), rows["bid"].tolist())]
+    return Replay(steps, players, decks, c=c, areas=areas,
+                  auctionstarter=steps[0].player, **gameargs)
+
+
+def game_ranges(log):
+    """
+    Row ranges (game id, start, stop) of every game of a StepLog
+    """
+    games = log["game"]
+    if len(games) == 0:
+        return []
+    bounds = [0] + (np.flatnonzero(np.diff(games)) + 1).tolist() + \
+        [len(games)]
+    return [(int(games[start]), start, stop)
+            for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def replayworker(args):
+    path, ranges, players, gameargs = args
+    columns = StepLog(path).columns()
+    games = []
+    states = []
+    for game, start, stop in ranges:
+        encoded = log_replay(columns, start, stop, players,
+                             **gameargs).encoded()
+        games.append(np.full(len(encoded), game))
+        states.append(encoded)
+    return np.concatenate(games), np.concatenate(states)
+
+
+def replay_log(path, players, processes=None, chunksize=256, **gameargs):
+    """
+    Replays all games of the StepLog in path. Returns (games, states):
+    the game id and encode() vector of every position of every game,
+    positions of a game in order. processes=1 replays in this process,
+    None uses all cores.
+    """
+    ranges = game_ranges(StepLog(path))
+    if not ranges:
+        return np.zeros(0, dtype=int), np.zeros((0, 0), dtype=np.int64)
+    jobs = [(path, ranges[i:i+chunksize], players, gameargs)
+            for i in range(0, len(ranges), chunksize)]
+    if processes == 1:
+        results = list(map(replayworker, jobs))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(replayworker, jobs)
+    return (np.concatenate([games for games, _ in results]),
+            np.concatenate([states for _, states in results]))
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    start = time.perf_counter()
+    games, states = replay_log(sys.argv[1], int(sys.argv[2]))
+    print(len(np.unique(games)), "games,", len(states), "positions in",
+          time.perf_counter() - start, "s")
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Self-play training data for ANN value networks.
+
+Producer processes play games with pluggable agents and send every
+decision point, encoded with Game.encode() and labelled with the game
+outcome, through a bounded queue. The trainer side keeps a fixed size
+ring buffer of examples and samples mini-batches from it, so memory
+stays bounded however long training runs.
+
+with SelfPlayStream([RandomAgent] * 3, workers=4) as stream:
+    for i, (in_matrix, targets) in zip(range(10000), stream):
+        net.train_batch(in_matrix, targets)
+"""
+
+import multiprocessing
+import queue
+import numpy as np
+from game import PHASE_FIELDS
+from numgame import NumGame
+from agents import play_step
+
+
+def game_examples(factories, seed, game_cls=NumGame, **gameargs):
+    """
+    Plays one game, returns (states, players, targets): encoded states
+    at every auction decision, the deciding player and targets
+    [1 if the player won else 0, player's share of final funds].
+    """
+    players = len(factories)
+    agents = [factory() for factory in factories]
+    game = game_cls(players, rng=seed, **gameargs)
+    states = []
+    deciders = []
+    for phase, player in game:
+        if phase.type == "auction":
+            states.append(game.encode())
+            deciders.append(player)
+            play_step(agents[player], phase, player)
+    deciders = np.array(deciders, dtype=np.int64)
+    winner, _ = game.rowinfo(game.winner())
+    funds = np.array(game.playerfunds, dtype=float)
+    targets = np.empty((len(deciders), 2))
+    targets[:, 0] = deciders == winner
+    targets[:, 1] = funds[deciders] / max(funds.sum(), 1.0)
+    return np.array(states), deciders, targets
+
+
+def feature_scale(game):
+    """
+    Divisors that bring encode() vectors of game roughly to [0, 1]
+    """
+    n = game.r*game.c
+    money = 10000.0
+    scale = np.ones(game.encodedsize())
+    scale[n:n+game.players] = money
+    n += game.players
+    decksize = len(game.areadeck)
+    scale[n:n+PHASE_FIELDS] = (decksize, decksize, game.players, 1, 1,
+                               game.players, money, game.players, 1, game.c)
+    return scale
+
+
+def features(states, players, scale, n_players):
+    """
+    Float input matrix: scaled states and a one-hot deciding player
+    """
+    out = np.empty((len(states), states.shape[1] + n_players))
+    np.divide(states, scale, out=out[:, :states.shape[1]])
+    out[:, states.shape[1]:] = 0
+    out[np.arange(len(states)), states.shape[1] + players] = 1
+    return out
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of capacity examples in preallocated arrays.
+    With prioritized sampling examples are drawn with probability
+    proportional to priority**alpha; new examples get the highest
+    priority seen so far.
+    """
+
+    def __init__(self, capacity, state_size, target_size=2,
+                 prioritized=False, alpha=0.6, rng=None):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, state_size), dtype=np.int64)
+        self.players = np.zeros(capacity, dtype=np.int64)
+        self.targets = np.zeros((capacity, target_size))
+        self.priorities = np.zeros(capacity)
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.rng = np.random.default_rng(rng)
+        self.size = 0
+        self.next = 0
+        self.max_priority = 1.0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, states, players, targets):
+        """
+        Adds rows, overwriting the oldest when full
+        """
+        n = len(states)
+        if n > self.capacity:
+            states = states[-self.capacity:]
+            players = players[-self.capacity:]
+            targets = targets[-self.capacity:]
+            n = self.capacity
+        indices = (self.next + np.arange(n)) % self.capacity
+        self.states[indices] = states
+        self.players[indices] = players
+        self.targets[indices] = targets
+        self.priorities[indices] = self.max_priority
+        self.next = (self.next + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        Returns (indices, states, players, targets)
+        """
+        if self.prioritized:
+            weights = self.priorities[:self.size] ** self.alpha
+            indices = self.rng.choice(self.size, batch_size,
+                                      p=weights / weights.sum())
+        else:
+            indices = self.rng.integers(self.size, size=batch_size)
+        return (indices, self.states[indices], self.players[indices],
+                self.targets[indices])
+
+    def update_priorities(self, indices, priorities):
+        """
+        Sets priorities of sampled examples, for example to their loss
+        """
+        priorities = np.maximum(priorities, 1e-6)
+        self.priorities[indices] = priorities
+        self.max_priority = max(self.max_priority, priorities.max())
+
+
+def produce(examples, factories, seed, worker, game_cls, gameargs):
+    """
+    Producer process: plays games forever, putting their examples
+    into the examples queue
+    """
+    seeds = np.random.SeedSequence([seed, worker])
+    while True:
+        examples.put(game_examples(factories, seeds.spawn(1)[0], game_cls,
+                                   **gameargs))
+
+
+class SelfPlayStream:
+    """
+    Iterator of (in_matrix, targets) mini-batches for ANN.train_batch()
+    from workers background producer processes.
+
+    targets picks target columns: 0 is win, 1 is share of funds.
+    Batches start when the buffer has min_size examples; after that
+    the trainer only takes what producers have already finished.
+    queue_size bounds the finished games waiting in the queue.
+    """
+
+    def __init__(self, factories, workers=2, capacity=100000,
+                 batch_size=256, min_size=1000, targets=(0,),
+                 prioritized=False, queue_size=64, seed=0,
+                 game_cls=NumGame, **gameargs):
+        self.n_players = len(factories)
+        sample = game_cls(self.n_players, rng=0, **gameargs)
+        self.scale = feature_scale(sample)
+        self.buffer = ReplayBuffer(capacity, sample.encodedsize(),
+                                   prioritized=prioritized, rng=seed)
+        self.batch_size = batch_size
+        self.min_size = min(min_size, capacity)
+        self.targets = list(targets)
+        self.examples = multiprocessing.Queue(queue_size)
+        self.workers = [multiprocessing.Process(
+                            target=produce, daemon=True,
+                            args=(self.examples, factories, seed, worker,
+                                  game_cls, gameargs))
+                        for worker in range(workers)]
+        for process in self.workers:
+            process.start()
+        self.games = 0
+        self.last_indices = None
+
+    def input_size(self):
+        return len(self.scale) + self.n_players
+
+    def collect(self, block=False):
+        """
+        Moves finished games from the queue to the buffer
+        """
+        while True:
+            try:
+                states, players, targets = self.examples.get(block)
+            except queue.Empty:
+                return
+            self.buffer.add(states, players, targets)
+            self.games += 1
+            block = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.collect()
+        while len(self.buffer) < self.min_size:
+            self.collect(block=True)
+        indices, states, players, targets = \
+            self.buffer.sample(self.batch_size)
+        self.last_indices = indices
+        return (features(states, players, self.scale, self.n_players),
+                targets[:, self.targets])
+
+    def update_priorities(self, priorities):
+        """
+        Priorities for the examples of the last batch
+        """
+        self.buffer.update_priorities(self.last_indices, priorities)
+
+    def close(self):
+        for process in self.workers:
+            process.terminate()
+        for process in self.workers:
+            process.join()
+        self.examples.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+if __name__ == "__main__":
+    from agents import RandomAgent
+    from nn import ANN
+    with SelfPlayStream([RandomAgent] * 3, workers=2) as stream:
+        net = ANN.generated_net(stream.input_size(), 32, 1, rnd=True)
+        for i, (in_matrix, targets) in zip(range(2000), stream):
+            net.train_batch(in_matrix, targets, alfa=0.5)
+            if i % 500 == 0:
+                out = net.layer_matrices(in_matrix)[-1]
+                print(i, stream.games, np.mean((out - targets)**2))
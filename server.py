@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio server hosting many games at once.
+
+Clients speak line-delimited JSON over TCP or Unix sockets. Every game
+is one task driving Game.__iter__ and waiting for human moves without
+blocking the other games. A player who does not finish an auction step
+within the move timeout is passed by finalize_for(), as in any game.
+
+Client messages:
+{"op": "new", "players": 3, "bots": ["random"], "c": 9, "timeout": 30}
+                                 new game, bots take the last seats and
+                                 the client the first free one (if any).
+                                 "seed" is only taken for games of bots,
+                                 it would tell players the deck order.
+                                 players, c, areas and timeout are
+                                 checked against LIMITS.
+{"op": "join", "game": 4}        first free seat of game 4
+{"op": "act", "game": 4, "action": ["bid", 2000]}
+
+Server messages:
+{"type": "joined", "game": 4, "seat": 1, "players": 3}  seat null: watcher
+{"type": "state", "game": 4, "state": {...}}  public state, see publicstate()
+{"type": "delta", "game": 4, "delta": {...}}  changes, see delta()
+{"type": "turn", "game": 4, "seat": 1, "timeout": 30}
+{"type": "area", "game": 4, "area": 2}        hidden area after a check
+{"type": "end", "game": 4, "winner": 1}       winning player, null for King
+{"type": "error", "message": "..."}
+
+python server.py 8765   or   python server.py /tmp/trendsetters.sock
+"""
+
+import asyncio
+import json
+import sys
+from numgame import NumGame
+from agents import PassAgent, RandomAgent, play_step
+
+BOTS = {"pass": PassAgent, "random": RandomAgent}
+# Smallest and largest values clients may ask for
+LIMITS = {"players": (1, 10), "c": (1, 30), "areas": (1, 10),
+          "timeout": (0.001, 3600)}
+
+AUCTION_FIELDS = ("item", "area", "active", "activeplayer", "highest_bid",
+                  "highest_bidder", "hidden", "checked", "winner")
+
+
+def publicstate(game):
+    """
+    Public state of game as a JSON-ready dict. cells is the flat
+    boardvector(), area is only shown for sold auctions (unsold areas
+    stay hidden) and auction fields are None on payday.
+    """
+    phase = game.currentphase
+    state = {"cells": game.boardvector().tolist(),
+             "funds": [int(funds) for funds in game.playerfunds],
+             "areapos": game.areapos,
+             "type": phase.type}
+    state.update((key, None) for key in AUCTION_FIELDS)
+    if phase.type == "auction":
+        state.update(item=phase.item,
+                     area=None if phase.winner == None else phase.area,
+                     active=phase.active,
+                     activeplayer=phase.activeplayer,
+                     highest_bid=int(phase.highest_bid),
+                     highest_bidder=phase.highest_bidder,
+                     hidden=phase.hidden,
+                     checked=list(phase.checked),
+                     winner=phase.winner)
+    return state
+
+
+def delta(old, new):
+    """
+    Changes from publicstate old to new: cells and funds as
+    [index, value] pairs, other changed fields as is
+    """
+    changes = {}
+    for key in ("cells", "funds"):
+        pairs = [[i, value] for i, (was, value)
+                 in enumerate(zip(old[key], new[key])) if was != value]
+        if pairs:
+            changes[key] = pairs
+    for key in set(old) | set(new):
+        if key not in ("cells", "funds") and old.get(key) != new.get(key):
+            changes[key] = new.get(key)
+    return changes
+
+
+def apply_delta(state, changes):
+    """
+    Applies delta() changes to a client's copy of the state
+    """
+    for key, value in changes.items():
+        if key in ("cells", "funds"):
+            for i, item in value:
+                state[key][i] = item
+        else:
+            state[key] = value
+    return state
+
+
+def illegal(phase, action):
+    """
+    Reason why action can not be taken now, None if it can
+    """
+    try:
+        kind, amount = action
+    except (TypeError, ValueError):
+        return "Action must be [kind, amount]"
+    if kind == "check":
+        legal = phase.can_check()
+    elif kind == "hide":
+        legal = phase.can_hide()
+    elif kind == "bid":
+        legal = (isinstance(amount, int) and
+                 phase.highest_bid + phase.BIDDING_STEP <= amount
+                 <= phase.playerfunds())
+    elif kind == "pass":
+        legal = True
+    else:
+        return "Unknown action " + str(kind)
+    return None if legal else "Illegal action " + str(kind)
+
+
+class Client:
+    """
+    One connection. Writes are buffered by the transport, so sending
+    never blocks a game.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write((json.dumps(message) + "\n").encode())
+
+
+class HostedGame:
+    """
+    A game with agents for bot seats and clients for human seats.
+    run() starts playing when every human seat is taken.
+    """
+
+    def __init__(self, id, game, agents, timeout):
+        self.id = id
+        self.game = game
+        self.agents = agents
+        self.timeout = timeout
+        self.clients = [None] * game.players
+        self.watchers = []
+        self.state = None
+        self.pending = None # Future for the active human's action
+        self.started = asyncio.Event()
+        self.seated()
+
+    def seated(self):
+        if all(agent != None or client != None
+               for agent, client in zip(self.agents, self.clients)):
+            self.started.set()
+
+    def join(self, client):
+        """
+        Seats client on the first free human seat, returns it or None
+        if the client only watches
+        """
+        if client not in self.watchers:
+            self.watchers.append(client)
+        for seat, (agent, taken) in enumerate(zip(self.agents,
+                                                  self.clients)):
+            if agent == None and taken == None:
+                self.clients[seat] = client
+                self.seated()
+                return seat
+        return None
+
+    def broadcast(self, message):
+        message["game"] = self.id
+        for client in self.watchers:
+            client.send(message)
+
+    def push(self):
+        """
+        Sends state changes since the last push
+        """
+        state = publicstate(self.game)
+        changes = delta(self.state, state)
+        self.state = state
+        if changes:
+            self.broadcast({"type": "delta", "delta": changes})
+
+    def submit(self, client, action):
+        """
+        Hands client's action to the waiting game, returns an error
+        message or None
+        """
+        phase = self.game.currentphase
+        if (self.pending == None or self.pending.done() or
+                self.clients[phase.activeplayer] is not client):
+            return "Not your turn"
+        reason = illegal(phase, action)
+        if reason == None:
+            self.pending.set_result(tuple(action))
+        return reason
+
+    async def humanstep(self, phase, player):
+        client = self.clients[player]
+        loop = asyncio.get_running_loop()
+        try:
+            while phase.active and phase.activeplayer == player:
+                self.pending = loop.create_future()
+                client.send({"type": "turn", "game": self.id, "seat": player,
+                             "timeout": self.timeout})
+                action = await self.pending
+                area = phase.act(action)
+                if action[0] == "check":
+                    client.send({"type": "area", "game": self.id,
+                                 "area": area})
+                self.push()
+        finally:
+            self.pending = None
+
+    async def run(self):
+        await self.started.wait()
+        self.state = publicstate(self.game)
+        self.broadcast({"type": "state", "state": self.state})
+        for phase, player in self.game:
+            if phase.type == "auction":
+                agent = self.agents[player]
+                if agent != None:
+                    play_step(agent, phase, player)
+                    await asyncio.sleep(0)
+                else:
+                    try:
+                        await asyncio.wait_for(self.humanstep(phase, player),
+                                               self.timeout)
+                    except asyncio.TimeoutError:
+                        pass # __iter__ passes for the player
+            self.push()
+        self.push()
+        winner, _ = self.game.rowinfo(self.game.winner())
+        self.broadcast({"type": "end", "winner": winner})
+
+
+class GameServer:
+    """
+    Hosts games for clients connected with start()
+    """
+
+    def __init__(self, bots=None, timeout=30.0, game_cls=NumGame):
+        self.bots = BOTS if bots == None else bots
+        self.timeout = timeout
+        self.game_cls = game_cls
+        self.games = {}
+        self.tasks = set()
+        self.next_id = 0
+
+    def newgame(self, players, bots=(), timeout=None, seed=None, **gameargs):
+        """
+        Creates and schedules a HostedGame, bots are names in self.bots
+        """
+        if not 0 < players or len(bots) > players:
+            raise ValueError("Bad number of players or bots")
+        agents = ([None] * (players - len(bots)) +
+                  [self.bots[name]() for name in bots])
+        game = self.game_cls(players, rng=seed, **gameargs)
+        hosted = HostedGame(self.next_id, game, agents,
+                            self.timeout if timeout == None else timeout)
+        self.games[hosted.id] = hosted
+        self.next_id += 1
+        task = asyncio.ensure_future(hosted.run())
+        self.tasks.add(task)
+        task.add_done_callback(lambda task: self.finished(task, hosted))
+        return hosted
+
+    def finished(self, task, hosted):
+        self.tasks.discard(task)
+        self.games.pop(hosted.id, None)
+
+    def checklimits(self, message):
+        """
+        Error message if a game argument of message is not a number
+        within LIMITS, else None
+        """
+        for key, (low, high) in LIMITS.items():
+            value = message.get(key)
+            if value == None:
+                continue
+            number = (int, float) if key == "timeout" else int
+            if isinstance(value, bool) or not isinstance(value, number) or \
+                    not low <= value <= high:
+                return "{0} should be from {1} to {2}".format(key, low, high)
+
+    def joinmessage(self, hosted, seat):
+        return {"type": "joined", "game": hosted.id, "seat": seat,
+                "players": hosted.game.players}
+
+    def dispatch(self, client, message):
+        """
+        Handles one client message, returns an error message or None
+        """
+        op = message["op"]
+        if op == "new":
+            error = self.checklimits(message)
+            if error != None:
+                return error
+            bots = message.get("bots", ())
+            if "seed" in message and len(bots) != message["players"]:
+                return "Seeds are only allowed in games of bots"
+            gameargs = {key: message[key] for key in ("c", "areas", "seed")
+                        if key in message}
+            hosted = self.newgame(message["players"], bots,
+                                  message.get("timeout"), **gameargs)
+            client.send(self.joinmessage(hosted, hosted.join(client)))
+        elif op == "join":
+            hosted = self.games.get(message["game"])
+            if hosted == None:
+                return "No game " + str(message["game"])
+            client.send(self.joinmessage(hosted, hosted.join(client)))
+        elif op == "act":
+            hosted = self.games.get(message["game"])
+            if hosted == None:
+                return "No game " + str(message["game"])
+            return hosted.submit(client, message["action"])
+        else:
+            return "Unknown op " + str(op)
+
+    async def handle(self, reader, writer):
+        client = Client(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    error = self.dispatch(client, json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    error = "Bad message: " + str(e)
+                if error != None:
+                    client.send({"type": "error", "message": error})
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host=None, port=0, path=None):
+        """
+        Listens on a Unix socket if path is given, else on TCP host:port.
+        Returns the asyncio Server.
+        """
+        if path != None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(address):
+    server = GameServer()
+    if address.isdigit():
+        listener = await server.start(port=int(address))
+    else:
+        listener = await server.start(path=address)
+    async with listener:
+        await listener.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve(sys.argv[1] if len(sys.argv) > 1 else "8765"))
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Game positions in shared memory for worker processes.
+
+The parent publishes positions into one int64 block: a header, the
+encode() vector of the game and both decks. Workers attach to the block
+by name and read it through GameView without copying or unpickling.
+
+shared = SharedGame.from_game(game)
+shared.publish(game)                 # after every move
+...
+view = GameView(shared.name)         # in a worker
+generation = view.acquire()
+if view.currentphase.can_check() and view.has(0, 1, 3):
+    ...
+if not view.changed(generation):
+    ...                              # what was read is consistent
+
+publish() works like a seqlock: the generation is odd while a position
+is being written and even when it is complete. Reads between acquire()
+and a false changed() come from one position.
+"""
+
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from game import PHASE_FIELDS, Game, encodedsize
+from numgame import NumGame
+
+# Header fields
+(GENERATION, PLAYERS, C, AREAS, DECKLEN, CHECK_COST, HIDE_COST,
+ BIDDING_STEP) = range(8)
+HEADER = 8
+
+
+def blocksize(players, c, areas):
+    """
+    Size of a block in int64 words: header, encode() vector, decks
+    """
+    return HEADER + encodedsize(players, c, areas) + 2*(areas+1)*c
+
+
+class SharedGame:
+    """
+    Writer side of a shared position block. The creator should
+    close() and unlink() it when done.
+    """
+
+    def __init__(self, players, c=9, areas=3, name=None):
+        size = blocksize(players, c, areas)
+        self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                              size=size * 8)
+        self.words = np.ndarray(size, dtype=np.int64, buffer=self.shm.buf)
+        self.words[:] = 0
+        self.words[[PLAYERS, C, AREAS, DECKLEN]] = (players, c, areas,
+                                                   (areas+1) * c)
+        self.state = self.words[HEADER:HEADER + encodedsize(players, c, areas)]
+        decks = self.words[HEADER + len(self.state):]
+        self.areadeck, self.abilitydeck = np.split(decks, 2)
+        self.decks = None # decks of the last published game
+
+    @classmethod
+    def from_game(cls, game, name=None):
+        shared = cls(game.players, game.c, game.areas, name)
+        shared.publish(game)
+        return shared
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def generation(self):
+        return int(self.words[GENERATION])
+
+    def publish(self, game):
+        """
+        Writes the position of game, returns its generation
+        """
+        self.words[GENERATION] += 1
+        game.encode(out=self.state)
+        if self.decks is None or self.decks[0] is not game.areadeck or \
+                self.decks[1] is not game.abilitydeck:
+            self.areadeck[:] = game.areadeck
+            self.abilitydeck[:] = game.abilitydeck
+            self.decks = (game.areadeck, game.abilitydeck)
+        phase = game.currentphase
+        if phase.type == "auction":
+            self.words[[CHECK_COST, HIDE_COST, BIDDING_STEP]] = (
+                phase.CHECK_COST, phase.HIDE_COST, phase.BIDDING_STEP)
+        self.words[GENERATION] += 1
+        return self.generation
+
+    def close(self):
+        self.state = self.areadeck = self.abilitydeck = self.words = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class PhaseView:
+    """
+    Read only AuctionPhase/PaydayPhase fields of a GameView
+    """
+
+    def __init__(self, view):
+        self.view = view
+
+    def field(self, i):
+        return int(self.view.phasefields[i])
+
+    @property
+    def type(self):
+        return "payday" if self.field(3) else "auction"
+
+    @property
+    def active(self):
+        return bool(self.field(4))
+
+    @property
+    def activeplayer(self):
+        return None if self.type == "payday" else self.field(5)
+
+    @property
+    def highest_bid(self):
+        return self.field(6)
+
+    @property
+    def highest_bidder(self):
+        bidder = self.field(7)
+        return None if bidder == -1 else bidder
+
+    @property
+    def hidden(self):
+        return bool(self.field(8))
+
+    @property
+    def checked(self):
+        return np.flatnonzero(self.view.checkedflags).tolist()
+
+    @property
+    def item(self):
+        """
+        Ability on sale (of the last auction on payday)
+        """
+        view = self.view
+        pos = view.abilitypos if self.active else view.abilitypos - 1
+        return int(view.abilitydeck[pos])
+
+    @property
+    def CHECK_COST(self):
+        return int(self.view.words[CHECK_COST])
+
+    @property
+    def HIDE_COST(self):
+        return int(self.view.words[HIDE_COST])
+
+    @property
+    def BIDDING_STEP(self):
+        return int(self.view.words[BIDDING_STEP])
+
+    def playerfunds(self):
+        return int(self.view.playerfunds[self.activeplayer])
+
+    def can_check(self):
+        return self.playerfunds() >= self.CHECK_COST and not self.hidden
+
+    def can_hide(self):
+        return self.playerfunds() >= self.HIDE_COST and not self.hidden
+
+
+class GameView:
+    """
+    Read only Game API over a shared block: board, playerfunds, decks
+    and their cursors, has(), colfreqs(), rowweights(), leader(),
+    winner() and currentphase as a PhaseView. Arrays are views into
+    the block and change with every publish().
+    """
+
+    def __init__(self, name):
+        self.shm = shared_memory.SharedMemory(name=name)
+        header = np.ndarray(HEADER, dtype=np.int64, buffer=self.shm.buf)
+        self.players, self.c, self.areas, decklen = (
+            int(x) for x in header[[PLAYERS, C, AREAS, DECKLEN]])
+        self.r = self.players*self.areas + 1
+        self.winamount = self.c + self.c // 2 + 1
+        size = blocksize(self.players, self.c, self.areas)
+        self.words = np.ndarray(size, dtype=np.int64, buffer=self.shm.buf)
+        self.words.flags.writeable = False
+        n = HEADER + self.r*self.c
+        self.board = self.words[HEADER:n].reshape(self.r, self.c)
+        self.playerfunds = self.words[n:n + self.players]
+        n += self.players
+        self.phasefields = self.words[n:n + PHASE_FIELDS]
+        n += PHASE_FIELDS
+        self.checkedflags = self.words[n:n + self.players]
+        n += self.players
+        self.state = self.words[HEADER:n]
+        self.areadeck = self.words[n:n + decklen]
+        self.abilitydeck = self.words[n + decklen:n + 2*decklen]
+        self.currentphase = PhaseView(self)
+
+    @property
+    def generation(self):
+        return int(self.words[GENERATION])
+
+    def acquire(self, timeout=1.0):
+        """
+        Waits until no publish() is in progress, returns the generation
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            generation = self.generation
+            if generation % 2 == 0:
+                return generation
+            if time.monotonic() > deadline:
+                raise TimeoutError("Shared game is being written")
+            time.sleep(0)
+
+    def changed(self, generation):
+        return self.generation != generation
+
+    @property
+    def areapos(self):
+        return int(self.phasefields[0])
+
+    @property
+    def abilitypos(self):
+        return int(self.phasefields[1])
+
+    @property
+    def auctionstarter(self):
+        return int(self.phasefields[2])
+
+    # The Game rules only need the fields above
+    decksizes = Game.decksizes
+    find_row = Game.find_row
+    rowinfo = Game.rowinfo
+    has = Game.has
+    winner = Game.checkwinner
+
+    def colfreqs(self):
+        return self.board.sum(axis=0) + self.board[0]
+
+    def rowweights(self):
+        return self.board @ self.colfreqs()
+
+    def leader(self):
+        weights = self.rowweights()
+        row = int(weights.argmax())
+        return row, int(weights[row])
+
+    def togame(self, game_cls=NumGame):
+        """
+        A full game_cls copy of the position with its own decks,
+        for workers that simulate
+        """
+        game = game_cls(self.players, c=self.c, areas=self.areas, rng=0)
+        game.areadeck = self.areadeck.copy()
+        game.abilitydeck = self.abilitydeck.copy()
+        game.decode(self.state)
+        return game
+
+    def close(self):
+        self.board = self.playerfunds = self.phasefields = None
+        self.checkedflags = self.state = self.words = None
+        self.areadeck = self.abilitydeck = None
+        self.shm.close()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Game with a sparse board for many players, areas and abilities.
+"""
+
+import numpy as np
+from game import *
+
+
+class SparseGame(Game):
+    """
+    Game with the owned cells as sets: colrows[c] has the rows owning
+    ability c, rowcols[r] the abilities of row r.
+
+    Column frequencies and row weights are kept up to date by set() in
+    O(rows owning the column) and after changes the leader is searched
+    among rows owning something, so costs follow the number of owned
+    abilities instead of r*c. The board should only be changed through
+    set().
+    """
+
+    def emptyboard(self):
+        self.colrows = [set() for c in range(self.c)]
+        self.rowcols = [set() for r in range(self.r)]
+        self.freqs = np.zeros(self.c, dtype=np.int64)
+        self.weights = np.zeros(self.r, dtype=np.int64)
+        self.owners = set() # rows owning at least one ability
+        self.leaderrow = 0 # None when set() has changed the weights
+
+    @property
+    def board(self):
+        return BoardView(self.cell, self.r, self.c)
+
+    def cell(self, r, c):
+        return c in self.rowcols[r]
+
+    def set(self, r, c, val=1):
+        old = int(c in self.rowcols[r])
+        val = 1 if val else 0
+        if old == val:
+            return
+        self.hashcell(r, c, old, val)
+        delta = val - old
+        freq_delta = 2*delta if r == 0 else delta
+        # Rows already owning c gain the frequency change
+        if self.colrows[c]:
+            self.weights[list(self.colrows[c])] += freq_delta
+        if val:
+            self.colrows[c].add(r)
+            self.rowcols[r].add(c)
+            self.owners.add(r)
+        else:
+            self.colrows[c].discard(r)
+            self.rowcols[r].discard(c)
+            if not self.rowcols[r]:
+                self.owners.discard(r)
+        self.freqs[c] += freq_delta
+        self.weights[r] += delta * self.freqs[c]
+        self.leaderrow = None
+
+    def colfreqs(self):
+        return self.freqs.copy()
+
+    def rowweights(self):
+        return self.weights.copy()
+
+    def leader(self):
+        if self.leaderrow == None:
+            weights = self.weights
+            self.leaderrow = min(self.owners, default=0,
+                                 key=lambda row: (-weights[row], row))
+        return self.leaderrow, int(self.weights[self.leaderrow])
+
+    def has(self, player, area, ability):
+        return int(ability in self.rowcols[self.find_row(player, area)])
+
+    def boardvector(self):
+        vector = np.zeros(self.r * self.c, dtype=np.int64)
+        for r in self.owners:
+            vector[[r*self.c + c for c in self.rowcols[r]]] = 1
+        return vector
+
+    def cells(self):
+        """
+        Owned cells as a sorted list of (r, c)
+        """
+        return sorted((r, c) for r in self.owners for c in self.rowcols[r])
+
+
+if __name__ == "__main__":
+    import time
+    from bench import play_random
+    from numgame import NumGame
+    for cls in [NumGame, SparseGame]:
+        start = time.perf_counter()
+        for i in range(20):
+            play_random(cls(20, c=60, areas=6))
+        print(cls.__name__, 20 / (time.perf_counter() - start), "games/s")
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy as np
+from numgame import NumGame
+from batchgame import BatchNumGame
+from game import CHECK, HIDE, PASS
+from agents import (BID_CODE, CHECK_CODE, HIDE_CODE, PASS_CODE, action_code,
+                    action_mask, action_masks, code_action, legal_actions,
+                    legal_codes)
+
+
+class TestActionCodes(unittest.TestCase):
+
+    def test_roundtrip(self):
+        phase = NumGame(3, c=5, rng=1).currentphase
+        phase.bid(2000)
+        for code in legal_codes(phase, (1, 3)):
+            action = code_action(phase, code, (1, 3))
+            self.assertEqual(action_code(phase, action, (1, 3)), code)
+        self.assertEqual(code_action(phase, BID_CODE + 1, (1, 3)),
+                         ("bid", 5000))
+        with self.assertRaises(ValueError):
+            action_code(phase, ("bid", 4000), (1, 3))
+
+    def test_mask(self):
+        game = NumGame(3, c=5, rng=1)
+        phase = game.currentphase
+        self.assertEqual(action_mask(phase).tolist(), [True] * 5)
+        phase.check()
+        game.playerfunds[0] = 1500
+        self.assertEqual(legal_codes(phase).tolist(), [PASS_CODE, HIDE_CODE,
+                                                      BID_CODE])
+        self.assertEqual(legal_actions(phase), [PASS, HIDE, ("bid", 1000)])
+        phase.hide()
+        self.assertEqual(legal_actions(phase), [PASS])
+        self.assertNotIn(CHECK, legal_actions(phase))
+
+    def test_batch_same_as_single(self):
+        funds = np.array([0, 1000, 2500, 9000])
+        bids = np.array([0, 0, 1000, 8000])
+        hidden = np.array([False, True, False, False])
+        checked = np.array([False, False, True, False])
+        masks = action_masks(funds, bids, 1000, (1, 2), hidden, checked)
+        self.assertEqual(masks.shape, (4, 5))
+        for i in range(4):
+            game = NumGame(3, c=5, rng=1)
+            phase = game.currentphase
+            game.playerfunds[0] = int(funds[i]) + 1000 * int(checked[i])
+            if bids[i]:
+                phase.highest_bid = int(bids[i])
+            if checked[i]:
+                phase.check()
+            phase.hidden = bool(hidden[i])
+            np.testing.assert_array_equal(masks[i], action_mask(phase))
+        self.assertFalse(masks[:, CHECK_CODE][1])
+
+    def test_batchgame(self):
+        batch = BatchNumGame(4, 3, seeds=range(4), c=5)
+        batch.check(np.array([True, False, True, False]))
+        batch.hide(np.array([False, True, False, False]))
+        masks = batch.action_masks()
+        self.assertEqual(masks[:, CHECK_CODE].tolist(),
+                         [False, False, False, True])
+        self.assertEqual(masks[:, HIDE_CODE].tolist(),
+                         [True, False, True, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
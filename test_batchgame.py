@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy as np
+from numgame import NumGame
+from batchgame import BatchNumGame
+
+
+def policy(k, player, funds, highest_bid, area):
+    """
+    Deterministic test policy working on scalars and on arrays.
+    k is auction number, area is the checked area or -1.
+    Returns (check, hide, bid), bid 0 is a pass.
+    """
+    check = (k + player) % 3 == 0
+    hide = (k + 2*player) % 5 == 0
+    bid = highest_bid + 1000 * (1 + (k + player) % 2)
+    bidding = ((k*7 + player) % 3 != 0) & (area != 0) & (funds >= bid)
+    return check, hide, np.where(bidding, bid, 0)
+
+
+def play_numgame(game):
+    """
+    Plays game with policy, returns number of auctions
+    """
+    k = 0
+    for phase, player in game:
+        if phase.type == "auction":
+            check, hide, _ = policy(k, player, 0, 0, -1)
+            area = -1
+            if check and phase.can_check():
+                area = phase.check()
+            if hide and phase.can_hide():
+                phase.hide()
+            _, _, bid = policy(k, player, phase.playerfunds(),
+                               phase.highest_bid, area)
+            if bid > 0:
+                phase.bid(int(bid))
+            else:
+                phase.pass_bid()
+            if not phase.active:
+                k += 1
+    return k
+
+
+def play_batch(batch):
+    while not batch.done():
+        k = batch.auctions.max()
+        player = batch.activeplayer
+        check, hide, _ = policy(k, player, 0, 0, -1)
+        area = np.full(batch.n, -1)
+        if check:
+            area = batch.check(batch.can_check())
+        if hide:
+            batch.hide(batch.can_hide())
+        _, _, bids = policy(k, player, batch.funds(), batch.highest_bid, area)
+        batch.bid(bids)
+
+
+class TestBatchNumGame(unittest.TestCase):
+
+    def test_same_as_numgames(self):
+        for players in [1, 2, 3, 4]:
+            seeds = [100*players + i for i in range(20)]
+            games = [NumGame(players, rng=seed) for seed in seeds]
+            batch = BatchNumGame(20, players, seeds=seeds)
+            lengths = [play_numgame(g) for g in games]
+            play_batch(batch)
+            self.assertEqual(lengths, batch.auctions.tolist())
+            self.assertEqual([g.winner() for g in games],
+                             batch.winners.tolist())
+            self.assertEqual([g.playerfunds for g in games],
+                             batch.playerfunds.tolist())
+            for i, g in enumerate(games):
+                self.assertEqual(g.board.tolist(), batch.board[i].tolist())
+
+    def test_finished_games_are_frozen(self):
+        batch = BatchNumGame(2, 2, c=5)
+        batch.finished[1] = True
+        funds = batch.playerfunds[1].copy()
+        batch.check([True, True])
+        batch.bid([2000, 2000])
+        batch.pass_bid()
+        self.assertEqual(batch.playerfunds[1].tolist(), funds.tolist())
+        self.assertEqual(batch.board[1].sum(), 0)
+        self.assertEqual(batch.board[0].sum(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
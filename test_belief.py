@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+import random
+import unittest
+import numpy as np
+from numgame import NumGame
+from agents import RandomAgent, legal_actions, play_step
+from ismcts import ISMCTSAgent
+from belief import AliasTable, BeliefTracker
+
+
+class TestAliasTable(unittest.TestCase):
+
+    def test_frequencies(self):
+        weights = [1, 0, 3, 6]
+        table = AliasTable(weights)
+        rng = random.Random(0)
+        counts = np.bincount([table.sample(rng) for i in range(20000)],
+                             minlength=4)
+        self.assertEqual(counts[1], 0)
+        np.testing.assert_allclose(counts / 20000, np.array(weights) / 10,
+                                   atol=0.02)
+
+
+class TestBeliefTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.game = NumGame(3, c=5, rng=4)
+        self.belief = BeliefTracker(self.game, 1)
+
+    def test_initial(self):
+        game = self.game
+        self.assertEqual(self.belief.unseen_areas().tolist(),
+                         sorted(game.areadeck.tolist()))
+        np.testing.assert_allclose(self.belief.area_distribution(),
+                                   np.full(game.areas+1, 1 / (game.areas+1)))
+
+    def test_observe(self):
+        """
+        Unseen cards are the deck from the current auction on plus the
+        areas of unsold auctions the player did not check
+        """
+        game = self.game
+        agent = RandomAgent(rng=4)
+        unsold = []
+        for phase, player in game:
+            if phase.type == "auction":
+                self.belief.observe(game)
+                if game.areapos == 3 and player == 1 and phase.can_check():
+                    phase.check()
+                    self.belief.observe(game)
+                    self.assertEqual(self.belief.known, phase.area)
+                if game.areapos == 6:
+                    break
+                play_step(agent, phase, player)
+                if not phase.active and phase.winner == None and \
+                        1 not in phase.checked:
+                    unsold.append(phase.area)
+        self.assertEqual(self.belief.areapos, game.areapos)
+        self.assertEqual(self.belief.public, game.abilitypos + 1)
+        expected = game.areadeck[game.areapos:].tolist() + unsold
+        self.assertEqual(self.belief.unseen_areas().tolist(),
+                         sorted(expected))
+        self.assertEqual(self.belief.unseen_abilities().tolist(),
+                         sorted(game.abilitydeck[game.abilitypos+1:]))
+
+    def test_check(self):
+        belief = self.belief
+        before = belief.unseen.copy()
+        belief.check(0)
+        self.assertEqual(belief.known, None)
+        np.testing.assert_array_equal(belief.opponent_knowledge(0),
+                                      belief.area_distribution())
+        self.assertIsNone(belief.opponent_knowledge(2))
+        belief.check(1, 2)
+        np.testing.assert_array_equal(belief.area_distribution(),
+                                      [0, 0, 1, 0])
+        self.assertEqual(belief.sample_area(), 2)
+        before[2] -= 1
+        np.testing.assert_allclose(belief.next_area_distribution(),
+                                   before / before.sum())
+        belief.poparea(2)
+        self.assertEqual(belief.unseen.tolist(), before.tolist())
+        self.assertEqual(belief.known, None)
+        self.assertEqual(belief.checkers, set())
+
+    def test_weigh_area(self):
+        belief = self.belief
+        belief.unseen[:] = [1, 2, 3, 4]
+        belief.weigh_area(np.array([1.0, 0.5, 0.0, 1.0]))
+        area = np.array([1, 1, 0, 4]) / 6
+        np.testing.assert_allclose(belief.area_distribution(), area)
+        np.testing.assert_allclose(belief.next_area_distribution(),
+                                   (belief.unseen - area) / 9)
+        rng = random.Random(1)
+        self.assertNotIn(2, {belief.sample_area(rng) for i in range(200)})
+
+    def test_decoded_hidden(self):
+        """
+        Decoded positions have no step history telling who hid
+        """
+        game = self.game
+        game.currentphase.hide()
+        game.currentphase.pass_bid()
+        copy = NumGame(3, c=5, rng=4)
+        copy.decode(game.encode())
+        self.belief.observe(copy)
+        self.assertTrue(self.belief.hidden)
+        self.assertIsNone(self.belief.hider)
+        agent = ISMCTSAgent(iterations=10, rng=4)
+        phase = copy.currentphase
+        self.assertIn(agent.act(phase, phase.activeplayer),
+                      legal_actions(phase))
+
+    def test_popability(self):
+        belief = self.belief
+        item = int(self.game.abilitydeck[0])
+        belief.popability(item)
+        self.assertEqual(belief.abilities[item], self.game.areas)
+        self.assertAlmostEqual(belief.ability_distribution().sum(), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
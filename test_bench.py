@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from numgame import NumGame
+from bench import (compare, load_baseline, midgame, query_rates,
+                   save_baseline)
+
+
+class TestBench(unittest.TestCase):
+
+    def test_compare(self):
+        baseline = {"a": 100.0, "b": 100.0, "c": 100.0}
+        results = {"a": 95.0, "b": 80.0, "d": 1.0}
+        self.assertEqual(compare(results, baseline, 0.1),
+                         [("b", 100.0, 80.0, 0.8)])
+        self.assertEqual(compare(results, baseline, 0.25), [])
+
+    def test_baseline_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "baseline.json")
+            save_baseline({"NumGame/games": 12.5}, path)
+            self.assertEqual(load_baseline(path), {"NumGame/games": 12.5})
+
+    def test_queries(self):
+        game = midgame(NumGame, players=2, c=5, fill=0.5)
+        self.assertEqual(game.areapos,
+                         NumGame(2, c=5).decksizes()[0] // 2)
+        rates = query_rates(NumGame, min_time=0.01, players=2, c=5)
+        self.assertEqual(sorted(rates), ["colfreqs", "rowweights", "winner"])
+        self.assertTrue(all(value > 0 for value in rates.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
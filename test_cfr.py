@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+import numpy as np
+from numgame import NumGame
+from agents import play_step
+from cfr import Abstraction, MCCFR, Policy, PolicyAgent, regretmatching
+
+
+class TestCFR(unittest.TestCase):
+
+    def test_regretmatching(self):
+        mask = np.array([True, True, False])
+        np.testing.assert_allclose(
+            regretmatching(np.array([1.0, 3.0, 5.0]), mask), [0.25, 0.75, 0])
+        np.testing.assert_allclose(
+            regretmatching(np.array([-1.0, 0.0, 5.0]), mask), [0.5, 0.5, 0])
+
+    def test_abstraction(self):
+        abstraction = Abstraction()
+        game = NumGame(3, c=5, rng=0)
+        for phase, player in game:
+            if phase.type == "auction":
+                bucket = abstraction.bucket(game, phase, player)
+                self.assertTrue(0 <= bucket < abstraction.size)
+                mask = abstraction.legal(phase)
+                self.assertTrue(mask[0])
+                index = np.flatnonzero(mask)[-1]
+                phase.act(abstraction.action(phase, index))
+
+    def test_train(self):
+        cfr = MCCFR(players=2, c=5)
+        cfr.train(60, processes=2, batch_size=20)
+        self.assertEqual(cfr.iterations, 60)
+        self.assertTrue(np.all(cfr.regrets >= 0))
+        self.assertTrue(cfr.strategy.sum() > 0)
+        policy = cfr.policy()
+        self.assertEqual(policy.table.dtype, np.float32)
+        np.testing.assert_allclose(policy.table.sum(axis=1), 1, rtol=1e-5)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "policy.npz")
+            policy.save(path)
+            loaded = Policy.load(path)
+        np.testing.assert_array_equal(loaded.table, policy.table)
+        self.assertEqual(loaded.abstraction.shape, policy.abstraction.shape)
+        agent = PolicyAgent(loaded, rng=0)
+        game = NumGame(2, c=5, rng=1)
+        for phase, player in game:
+            if phase.type == "auction":
+                probs = loaded.probabilities(game, phase, player)
+                self.assertAlmostEqual(probs.sum(), 1.0, places=5)
+                play_step(agent, phase, player)
+
+
+if __name__ == "__main__":
+    unittest.main()
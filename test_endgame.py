@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import collections
+import copy
+import itertools
+import unittest
+import numpy as np
+from numgame import NumGame
+from agents import RandomAgent, play_step
+from belief import BeliefTracker
+from endgame import EndgameSolver, EndgameAgent
+
+
+def endposition(seed, cards, players=2, c=3):
+    """
+    Random game stopped at the start of the auction with cards left,
+    and the beliefs of player 0 who watched it
+    """
+    game = NumGame(players, c=c, rng=seed)
+    agent = RandomAgent(rng=seed)
+    belief = BeliefTracker(game, 0)
+    for phase, player in game:
+        if phase.type == "auction":
+            belief.observe(game)
+            if game.decksizes()[0] <= cards:
+                return game, belief
+            play_step(agent, phase, player)
+
+
+def passout(game, areas, abilities):
+    """
+    Winner of game after everyone passes, with the decks from the
+    current cards on replaced by areas and abilities
+    """
+    game.areadeck = game.areadeck.copy()
+    game.abilitydeck = game.abilitydeck.copy()
+    game.areadeck[game.areapos:] = areas
+    game.abilitydeck[game.abilitypos+1:] = abilities
+    for phase, player in game:
+        pass
+    values = np.zeros(game.players)
+    player, _ = game.rowinfo(game.winner())
+    if player != None:
+        values[player] = 1.0
+    return values
+
+
+class TestEndgame(unittest.TestCase):
+
+    def test_chance_over_orders(self):
+        """
+        Without bids the values are averages over all deck orders
+        the player cannot tell apart: the areas left are any of the
+        unseen areas
+        """
+        for seed in range(4):
+            game, belief = endposition(seed, 3)
+            values, action = EndgameSolver(raises=()).solve(game, belief)
+            self.assertEqual(action, ("pass", None))
+            left = game.decksizes()[0]
+            areas = collections.Counter(itertools.permutations(
+                belief.unseen_areas().tolist(), left))
+            abilities = list(itertools.permutations(
+                game.abilitydeck[game.abilitypos+1:]))
+            expected = sum(count * passout(copy.deepcopy(game), order,
+                                           ability)
+                           for order, count in areas.items()
+                           for ability in abilities)
+            np.testing.assert_allclose(
+                values, expected / sum(areas.values()) / len(abilities))
+
+    def test_public_information(self):
+        """
+        Values do not depend on which unseen cards are left in the deck
+        """
+        game, belief = endposition(1, 3)
+        values = EndgameSolver(raises=(1,)).solve(game, belief)[0]
+        other = copy.deepcopy(game)
+        other.areadeck = other.areadeck.copy()
+        unseen = belief.unseen_areas()
+        for left in [unseen[:3], unseen[-3:]]:
+            other.areadeck[other.areapos:] = left
+            np.testing.assert_allclose(
+                EndgameSolver(raises=(1,)).solve(other, belief)[0], values)
+
+    def test_solve(self):
+        game, belief = endposition(1, 2, players=3)
+        before = game.encode().tolist()
+        deck = game.areadeck.tolist()
+        solver = EndgameSolver()
+        values, action = solver.solve(game, belief)
+        self.assertEqual(game.encode().tolist(), before)
+        self.assertEqual(game.areadeck.tolist(), deck)
+        self.assertTrue(np.all(values >= 0) and values.sum() <= 1 + 1e-9)
+        self.assertIn(action[0], ("pass", "bid"))
+        nodes = solver.nodes
+        self.assertEqual(solver.solve(game, belief)[1], action)
+        self.assertEqual(solver.nodes, nodes)
+        belief.check(0, game.currentphase.area)
+        known = solver.solve(game, belief)[0]
+        self.assertTrue(np.all(known >= 0) and known.sum() <= 1 + 1e-9)
+
+    def test_agent(self):
+        agent = EndgameAgent(RandomAgent(rng=0), threshold=2)
+        game = NumGame(2, c=3, rng=5)
+        for phase, player in game:
+            if phase.type == "auction":
+                play_step(agent, phase, player)
+        self.assertNotEqual(game.winner(), None)
+        self.assertTrue(agent.solver.nodes > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy as np
+from numgame import NumGame
+from game import PASS
+from nn import ANN
+from selfplay import feature_scale, features
+from evalcache import EvalCache
+
+
+def value_features(game, player):
+    states = game.encode()[None, :]
+    return features(states, np.array([player]), feature_scale(game),
+                    game.players)[0]
+
+
+class CountingANN(ANN):
+
+    def __init__(self, conn_list):
+        super().__init__(conn_list)
+        self.rows = 0
+
+    def out_vector(self, in_vector):
+        self.rows += 1
+        return super().out_vector(in_vector)
+
+    def layer_matrices(self, in_matrix):
+        self.rows += len(in_matrix)
+        return super().layer_matrices(in_matrix)
+
+
+class TestEvalCache(unittest.TestCase):
+
+    def setUp(self):
+        self.game = NumGame(3, c=5, rng=1)
+        size = len(value_features(self.game, 0))
+        np.random.seed(1)
+        self.net = CountingANN(ANN.generated_net(size, 6, 2,
+                                                 rnd=True).conn_list)
+        self.cache = EvalCache(self.net, value_features, size=3)
+
+    def test_hits(self):
+        game = self.game
+        first = self.cache.evaluate(game, 0)
+        np.testing.assert_allclose(first,
+                                   self.net.out_vector(value_features(game,
+                                                                      0)))
+        self.cache.evaluate(game, 1)
+        undo = game.make(PASS)
+        self.cache.evaluate(game, 0)
+        game.unmake(undo)
+        self.assertIs(self.cache.evaluate(game, 0), first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 3))
+        self.assertEqual(self.cache.hit_rate(), 0.25)
+
+    def test_items(self):
+        """
+        Auctions of different items are different entries
+        """
+        other = NumGame(3, c=5, rng=2)
+        self.assertNotEqual(other.currentphase.item,
+                            self.game.currentphase.item)
+        self.cache.evaluate(self.game, 0)
+        self.cache.evaluate(other, 0)
+        self.assertEqual((self.cache.hits, len(self.cache)), (0, 2))
+        self.cache.exact = True
+        self.cache.evaluate(self.game, 0)
+        self.cache.evaluate(other, 0)
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_lru_eviction(self):
+        games = [NumGame(3, c=5, rng=1) for i in range(4)]
+        for i, game in enumerate(games):
+            game.addfunds(0, -1000 * i)
+        for game in games[:3]:
+            self.cache.evaluate(game, 0)
+        self.cache.evaluate(games[0], 0)
+        self.cache.evaluate(games[3], 0)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertEqual(len(self.cache), 3)
+        self.cache.evaluate(games[0], 0)
+        self.assertEqual(self.cache.hits, 2)
+        self.cache.evaluate(games[1], 0)
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_invalidation(self):
+        game = self.game
+        before = self.cache.evaluate(game, 0).copy()
+        self.net.backprop(value_features(game, 0), np.array([1.0, 1.0]))
+        after = self.cache.evaluate(game, 0)
+        self.assertEqual(self.cache.invalidations, 1)
+        self.assertEqual(self.cache.hits, 0)
+        self.assertTrue((after > before).all())
+        self.net.conn_list = [conn.copy() for conn in self.net.conn_list]
+        self.cache.evaluate(game, 0)
+        self.assertEqual(self.cache.invalidations, 2)
+
+    def test_batch(self):
+        game = self.game
+        self.cache.size = 10
+        self.cache.evaluate(game, 0)
+        other = NumGame(3, c=5, rng=1)
+        other.make(PASS)
+        self.net.rows = 0
+        outs = self.cache.evaluate_batch([game, other, game, other],
+                                         [0, 0, 1, 0])
+        self.assertEqual(self.net.rows, 2)
+        self.assertEqual(outs.shape, (4, 2))
+        for out, (g, player) in zip(outs, [(game, 0), (other, 0), (game, 1),
+                                           (other, 0)]):
+            np.testing.assert_allclose(
+                out, ANN.out_vector(self.net, value_features(g, player)))
+        self.cache.evaluate_batch([other], [0])
+        self.assertEqual(self.net.rows, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy as np
+from numgame import NumGame
+from batchgame import BatchNumGame
+from evolve import (Population, NetAgent, batch_features, game_features,
+                    forward, decide, play_population)
+
+
+class TestEvolve(unittest.TestCase):
+
+    def test_forward_is_ann(self):
+        population = Population(6, rng=0)
+        x = np.random.default_rng(1).random((4, 8))
+        nets = np.array([5, 0, 5, 2])
+        out = forward(population.weights, nets, x)
+        for i, net in enumerate(nets):
+            np.testing.assert_allclose(
+                out[i], population.ann(net).out_vector(x[i]))
+
+    def test_same_as_game(self):
+        """
+        NetAgent on a NumGame sees and does what the batch does
+        """
+        population = Population(3, rng=2, c=5)
+        seats = np.array([[2, 0, 1]])
+        batch = BatchNumGame(1, 3, c=5, seeds=[4])
+        game = NumGame(3, c=5, rng=4)
+        agents = [NetAgent(population.ann(net)) for net in seats[0]]
+        for phase, player in game:
+            if phase.type == "auction":
+                np.testing.assert_allclose(batch_features(batch)[0],
+                                           game_features(game, phase, player))
+                out = forward(population.weights,
+                              seats[:, batch.activeplayer],
+                              batch_features(batch))
+                batch.bid(decide(out, batch.highest_bid, batch.funds(),
+                                 batch.BIDDING_STEP))
+                phase.act(agents[player].act(phase, player))
+        self.assertEqual(batch.playerfunds[0].tolist(), game.playerfunds)
+        winners, funds = play_population(population.weights, seats, [4],
+                                         c=5)
+        player, _ = game.rowinfo(game.winner())
+        self.assertEqual(winners[0], -1 if player == None else player)
+
+    def test_generation(self):
+        population = Population(9, rng=0, c=5)
+        fitness = population.evaluate(games_per_net=3)
+        self.assertEqual(fitness.shape, (9,))
+        self.assertTrue(np.all(fitness >= 0))
+        pooled = Population(9, rng=0, c=5).evaluate(games_per_net=3,
+                                                    processes=2)
+        np.testing.assert_allclose(fitness, pooled)
+        best = int(np.argmax(fitness))
+        weights = [conn[best].copy() for conn in population.weights]
+        population.select(fitness, elite=0.2)
+        self.assertEqual(population.weights[0].shape[0], 9)
+        for conn, old in zip(population.weights, weights):
+            np.testing.assert_array_equal(conn[0], old)
+        with self.assertRaises(ValueError):
+            Population(10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import tempfile
+import unittest
+import numpy as np
+from numgame import NumGame
+from game import AuctionStep
+from agents import RandomAgent, play_step
+from gamelog import StepLog
+
+
+def logged_game(log, game_id, seed):
+    """
+    Plays a random game and logs its auctions, returns their steps
+    """
+    game = NumGame(3, c=5, rng=seed)
+    agent = RandomAgent(rng=seed)
+    steps = []
+    for phase, player in game:
+        if phase.type == "auction":
+            if player == game.auctionstarter and phase.can_check():
+                phase.check()
+            play_step(agent, phase, player)
+            if not phase.active:
+                log.append_phase(game_id, game.areapos - 1, phase)
+                steps.extend((game_id, game.areapos - 1, step)
+                             for step in phase.steps)
+    return steps
+
+
+class TestStepLog(unittest.TestCase):
+
+    def test_slots(self):
+        step = AuctionStep(1, bid=3000)
+        with self.assertRaises(AttributeError):
+            step.extra = 1
+        self.assertEqual(step, AuctionStep(1, False, False, 3000))
+        self.assertNotEqual(step, AuctionStep(1, True, False, 3000))
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as path:
+            expected = []
+            with StepLog(path, buffer_size=7) as log:
+                for game_id in range(3):
+                    expected += logged_game(log, game_id, game_id)
+            log = StepLog(path)
+            self.assertEqual(len(log), len(expected))
+            self.assertEqual([(g, p, s.fields()) for g, p, s in log.steps()],
+                             [(g, p, s.fields()) for g, p, s in expected])
+            self.assertEqual(list(log.steps(5, 9, chunk=2))[0][2],
+                             expected[5][2])
+            bids = log["bid"]
+            self.assertIsInstance(bids, np.memmap)
+            self.assertEqual(bids.dtype, np.int64)
+            self.assertEqual(int((bids == -1).sum()),
+                             sum(s.bid == None for _, _, s in expected))
+            phases = log.phases()
+            self.assertEqual(sum(stop - start for start, stop in phases),
+                             len(expected))
+            self.assertTrue(all(stop - start == 3 for start, stop in phases))
+            with StepLog(path) as more:
+                more.append(9, 0, AuctionStep(2, bid=1000), 1, 2, None)
+            self.assertEqual(len(log), len(expected) + 1)
+            self.assertEqual(log["winner"][-1], -1)
+
+    def test_crash(self):
+        """
+        Rows left in some columns by a crash are dropped on open
+        """
+        with tempfile.TemporaryDirectory() as path:
+            with StepLog(path) as log:
+                log.append(1, 0, AuctionStep(0, bid=1000), 1, 2, 0)
+            with open(log.columnpath("game"), "ab") as f:
+                f.write(np.array([7], "<i8").tobytes())
+            with StepLog(path) as log:
+                log.append(2, 0, AuctionStep(1), 3, 1, None)
+            self.assertEqual(len(log), 2)
+            self.assertEqual(log["game"].tolist(), [1, 2])
+            self.assertEqual(log["player"].tolist(), [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
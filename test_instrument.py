@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+import unittest
+from numgame import NumGame
+from game import PASS
+from agents import RandomAgent, play_step
+from instrument import Profiler
+
+
+def play(seed, profiler=None):
+    game = NumGame(3, c=5, rng=seed)
+    game.profiler = profiler
+    agent = RandomAgent(rng=seed)
+    for phase, player in game:
+        if phase.type == "auction":
+            if phase.can_check() and player == 1:
+                phase.check()
+            play_step(agent, phase, player)
+    return game
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_same_game(self):
+        trace = io.StringIO()
+        profiler = Profiler(trace=trace, sample=1.0)
+        for seed in range(3):
+            plain = play(seed)
+            profiled = play(seed, profiler)
+            self.assertEqual(plain.boardvector().tolist(),
+                             profiled.boardvector().tolist())
+            self.assertEqual(plain.playerfunds, profiled.playerfunds)
+        summary = profiler.summary()
+        self.assertEqual(summary["games"], 3)
+        actions = summary["actions"]
+        auctions = summary["phases"]["auction"]
+        self.assertEqual(actions["bid"] + actions["pass"], 3 * auctions)
+        self.assertEqual(actions["check"], auctions)
+        self.assertEqual(actions["hide"], 0)
+        self.assertEqual(summary["cards"], auctions)
+        yields = 3 * auctions + summary["phases"]["payday"]
+        lines = [json.loads(line) for line in trace.getvalue().splitlines()]
+        self.assertEqual(len(lines), yields)
+        self.assertEqual(sum(line["action"] == "bid" for line in lines),
+                         actions["bid"])
+        self.assertTrue(summary["winner_calls"] >= yields + 3)
+        profiler.close()
+
+    def test_winner_calls(self):
+        """
+        winner() calls outside the loop are counted too
+        """
+        profiler = Profiler()
+        game = NumGame(3, c=5, rng=1)
+        game.profiler = profiler
+        game.make(PASS)
+        self.assertEqual(profiler.summary()["winner_calls"], 0)
+        game.make(PASS)
+        game.make(PASS)
+        self.assertGreater(profiler.summary()["winner_calls"], 0)
+        calls = profiler.winner_calls
+        self.assertEqual(game.winner(), None)
+        self.assertEqual(profiler.winner_calls, calls + 1)
+
+    def test_no_trace(self):
+        profiler = Profiler()
+        play(0, profiler)
+        self.assertEqual(profiler.summary()["games"], 1)
+        self.assertEqual(NumGame.profiler, None)
+
+
+if __name__ == "__main__":
+    unittest.main()
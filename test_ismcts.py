@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import unittest
+import numpy as np
+from numgame import NumGame
+from game import CHECK, PASS
+from agents import PassAgent, legal_actions, play_step
+from ismcts import ISMCTSAgent, step_actions, winning_player
+
+
+class TestISMCTS(unittest.TestCase):
+
+    def test_legal_move(self):
+        game = NumGame(3, c=5, rng=1)
+        agent = ISMCTSAgent(iterations=50, rng=1)
+        action = agent.act(game.currentphase, 0)
+        self.assertIn(action, legal_actions(game.currentphase))
+        self.assertEqual(sum(agent.root.stats()[a][0]
+                             for a in agent.root.children), 50)
+
+    def test_determinize(self):
+        game = NumGame(2, c=5, rng=2)
+        game.currentphase.pass_bid()
+        game.currentphase.pass_bid()
+        game.nextphase()
+        game.nextphase()
+        phase = game.currentphase
+        area = phase.check()
+        agent = ISMCTSAgent(iterations=1, rng=2)
+        agent.newgame(game)
+        agent.observe(phase, 1)
+        work = copy.deepcopy(game)
+        agent.prepare(work)
+        unseen = np.bincount(game.areadeck)
+        unseen[area] -= 1
+        for i in range(20):
+            agent.determinize(work)
+            self.assertEqual(work.currentphase.area, area)
+            self.assertEqual(work.currentphase.item, phase.item)
+            self.assertEqual(work.abilitydeck[:2].tolist(),
+                             game.abilitydeck[:2].tolist())
+            self.assertEqual(np.sort(work.abilitydeck).tolist(),
+                             np.sort(game.abilitydeck).tolist())
+            self.assertEqual(work.areadeck[:2].tolist(),
+                             game.areadeck[:2].tolist())
+            dealt = np.bincount(work.areadeck[2:], minlength=len(unseen))
+            self.assertTrue((dealt <= unseen).all())
+
+    def test_step_actions(self):
+        game = NumGame(3, c=5, rng=3)
+        phase = game.currentphase
+        phase.check()
+        phase.bid(1000)
+        phase.pass_bid()
+        self.assertEqual(step_actions(phase), [CHECK, ("bid", 1000), PASS])
+        self.assertEqual(step_actions(phase, 0, True, False),
+                         [("bid", 1000), PASS])
+        phase.check()
+        self.assertEqual(step_actions(phase, 2), [CHECK])
+
+    def test_tree_reuse(self):
+        game = NumGame(2, c=5, rng=4)
+        agent = ISMCTSAgent(iterations=200, rng=4)
+        phase = game.currentphase
+        action = agent.act(phase, 0)
+        child = agent.root.children[action]
+        phase.act(action)
+        if phase.active and phase.activeplayer == 0:
+            agent.act(phase, 0)
+            self.assertIs(agent.root, child)
+        else:
+            phase.pass_bid()
+            game.nextphase()
+            game.nextphase()
+            play_step(PassAgent(), game.currentphase, 1)
+            visits = child.children[PASS].children[PASS].visits
+            agent.act(game.currentphase, 0)
+            self.assertEqual(agent.root.visits, visits + 200)
+
+    def test_full_game(self):
+        game = NumGame(2, c=4, rng=5)
+        agents = [ISMCTSAgent(iterations=30, time_limit=1.0, rng=5),
+                  ISMCTSAgent(iterations=20, processes=2, rng=6)]
+        for phase, player in game:
+            if phase.type == "auction":
+                play_step(agents[player], phase, player)
+        agents[1].close()
+        self.assertNotEqual(game.winner(), None)
+        self.assertIn(winning_player(game), [0, 1, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -6,6 +6,8 @@ Created on Thu Jun 25 16:17:46 2015
 """
 
 
+import os
+import tempfile
 import unittest
 from nn import *
 
@@ -31,6 +33,104 @@ class TestBackprop(unittest.TestCase):
             print(in_pattern, xor_net_rnd.out_vector(np.array(in_pattern)))
             #self.assertAlmostEqual(target, xor_net.out_vector(in_pattern)[0], 1)
 
+    def test_train_batch(self):
+        """
+        Batch of one matches backprop, full batch learns XOR
+        """
+        net1 = ANN.generated_net(3, 4, 2, rnd=True)
+        net2 = ANN([conn.copy() for conn in net1.conn_list])
+        in_vector = np.array([0.2, 0.7, 1.0])
+        target = np.array([1.0, 0.0])
+        net1.backprop(in_vector, target, alfa=2)
+        net2.train_batch(in_vector, target, alfa=2)
+        for conn1, conn2 in zip(net1.conn_list, net2.conn_list):
+            self.assertTrue(np.allclose(conn1, conn2))
+        self.assertEqual((net1.version, net2.version), (1, 1))
+        np.random.seed(0)
+        xor_net = ANN.generated_net(2, 5, 1, rnd=True)
+        in_matrix = np.array([[0., 0.], [0., 1.], [1., 0.], [1., 1.]])
+        targets = np.array([[0.], [1.], [1.], [0.]])
+        for i in range(3000):
+            xor_net.train_batch(in_matrix, targets, alfa=10)
+        out = xor_net.layer_matrices(in_matrix)[-1]
+        self.assertTrue(np.allclose(out, targets, atol=0.2))
+        for in_vector, out_vector in zip(in_matrix, out):
+            self.assertTrue(np.allclose(xor_net.out_vector(in_vector),
+                                        out_vector))
+
+
+class TestPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "net.ann")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_save_load(self):
+        net = ANN.generated_net(3, 7, 2, rnd=True)
+        net.save(self.path)
+        for mmap in [True, False]:
+            loaded = ANN.load(self.path, mmap=mmap)
+            for conn, loaded_conn in zip(net.conn_list, loaded.conn_list):
+                self.assertEqual(conn.tolist(), loaded_conn.tolist())
+            self.assertEqual(loaded.out_vector(np.ones(3)).tolist(),
+                             net.out_vector(np.ones(3)).tolist())
+        shared = ANN.load(self.path)
+        with self.assertRaises(ValueError):
+            shared.backprop(np.ones(3), np.zeros(2))
+        private = ANN.load(self.path, mmap=False)
+        private.backprop(np.ones(3), np.zeros(2))
+
+    def test_checkpoint(self):
+        net = ANN.generated_net(2, 3, 1, rnd=True)
+        net.save(self.path)
+        old = ANN.load(self.path)
+        net.train_batch(np.ones((1, 2)), np.zeros((1, 1)), alfa=5)
+        net.save(self.path)
+        self.assertEqual(os.listdir(self.dir.name), ["net.ann"])
+        new = ANN.load(self.path)
+        self.assertEqual(new.conn_list[0].tolist(),
+                         net.conn_list[0].tolist())
+        self.assertNotEqual(old.conn_list[0].tolist(),
+                            new.conn_list[0].tolist())
+
+    def test_bad_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not weights at all")
+        with self.assertRaises(ValueError):
+            ANN.load(self.path)
+
+
+class TestCompiledANN(unittest.TestCase):
+
+    def test_outputs(self):
+        net = ANN.generated_net(6, 8, 5, 3, rnd=True)
+        in_matrix = np.random.rand(20, 6)
+        expected = np.array([net.out_vector(x) for x in in_matrix])
+        for dtype, tolerance in [(np.float64, 1e-12), (np.float32, 1e-5)]:
+            compiled = net.compiled(dtype)
+            out = compiled.out_vector(in_matrix[0])
+            self.assertEqual(out.dtype, dtype)
+            self.assertTrue(np.allclose(out, expected[0], atol=tolerance))
+            self.assertIs(compiled.out_vector(in_matrix[1]), out)
+            self.assertTrue(np.allclose(compiled.out_matrix(in_matrix),
+                                        expected, atol=tolerance))
+            self.assertTrue(np.allclose(compiled.out_matrix(in_matrix[:3]),
+                                        expected[:3], atol=tolerance))
+
+    def test_refresh(self):
+        net = ANN.generated_net(2, 3, 1, rnd=True)
+        compiled = net.compiled()
+        net.train_batch(np.ones((1, 2)), np.zeros((1, 1)), alfa=5)
+        self.assertFalse(np.allclose(compiled.out_vector(np.ones(2)),
+                                     net.out_vector(np.ones(2))))
+        compiled.refresh(net.conn_list)
+        self.assertTrue(np.allclose(compiled.out_vector(np.ones(2)),
+                                    net.out_vector(np.ones(2))))
+
+
 if __name__ == "__main__":
     unittest.main()        
         
\ No newline at end of file
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import tempfile
+import unittest
+import numpy as np
+from numgame import NumGame
+from agents import RandomAgent
+from gamelog import StepLog
+from replay import Replay, replay_log
+
+
+def recorded_game(seed, log=None, game_id=0):
+    """
+    Plays a random game making its actions, returns its steps and
+    the encoded positions after every action
+    """
+    game = NumGame(3, c=5, rng=seed, auctionstarter=seed % 3)
+    agent = RandomAgent(rng=seed)
+    rng = np.random.default_rng(seed)
+    states = [game.encode()]
+    steps = []
+    while game.winner() == None:
+        phase = game.currentphase
+        player = phase.activeplayer
+        if not phase.steps[-1].checked and phase.can_check() and \
+                rng.random() < 0.2:
+            action = ("check", None)
+        elif phase.can_hide() and rng.random() < 0.05:
+            action = ("hide", None)
+        else:
+            action = agent.act(phase, player)
+        game.make(action)
+        states.append(game.encode())
+        if not phase.active:
+            steps.extend(phase.steps)
+            if log != None:
+                log.append_phase(game_id, game.areapos - 1, phase)
+    return steps, np.array(states)
+
+
+class TestReplay(unittest.TestCase):
+
+    def test_positions(self):
+        steps, states = recorded_game(1)
+        replay = Replay(steps, 3, interval=8, c=5, rng=1, auctionstarter=1)
+        self.assertEqual(len(replay), len(states) - 1)
+        np.testing.assert_array_equal(replay.encoded(), states)
+        self.assertEqual(len(replay.snapshots), len(replay) // 8 + 1)
+
+    def test_seek(self):
+        steps, states = recorded_game(2)
+        replay = Replay(steps, 3, interval=5, c=5, rng=2, auctionstarter=2)
+        last = len(states) - 1
+        for k in [17, 3, last, last - 1, 0, 21, 6]:
+            np.testing.assert_array_equal(replay.seek(k).encode(), states[k])
+        with self.assertRaises(IndexError):
+            replay.seek(len(states))
+
+    def test_seek_end(self):
+        """
+        Rewinding and seeking to a snapshot at the end of the game
+        """
+        steps, states = recorded_game(2)
+        n = len(states) - 1
+        replay = Replay(steps, 3, interval=n, c=5, rng=2, auctionstarter=2)
+        for k in [n, 0, n]:
+            np.testing.assert_array_equal(replay.seek(k).encode(), states[k])
+        self.assertEqual(len(replay.snapshots), 2)
+        self.assertNotEqual(replay.game.winner(), None)
+
+    def test_replay_log(self):
+        with tempfile.TemporaryDirectory() as path:
+            expected = []
+            with StepLog(path) as log:
+                for game_id in range(5):
+                    _, states = recorded_game(game_id, log, game_id)
+                    expected.append(states)
+            for processes in [1, 2]:
+                games, states = replay_log(path, 3, processes=processes,
+                                           chunksize=2, c=5)
+                self.assertEqual(np.unique(games).tolist(), list(range(5)))
+                np.testing.assert_array_equal(states,
+                                              np.concatenate(expected))
+
+
+if __name__ == "__main__":
+    unittest.main()
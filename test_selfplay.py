@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy as np
+from numgame import NumGame
+from agents import PassAgent, RandomAgent
+from nn import ANN
+from selfplay import (game_examples, feature_scale, features, ReplayBuffer,
+                      SelfPlayStream)
+
+
+class TestSelfPlay(unittest.TestCase):
+
+    def test_game_examples(self):
+        states, players, targets = game_examples([RandomAgent] * 3, 1, c=5)
+        self.assertEqual(states.shape, (len(players),
+                                        NumGame(3, c=5).encodedsize()))
+        self.assertEqual(targets.shape, (len(players), 2))
+        self.assertTrue(set(targets[:, 0]) <= {0.0, 1.0})
+        self.assertTrue(np.all((targets[:, 1] >= 0) & (targets[:, 1] <= 1)))
+        self.assertTrue(np.all(players == states[:, 10*5 + 3 + 5]))
+        # The item on sale is recorded and scaled to [0, 1)
+        items = states[:, 10*5 + 3 + 9]
+        self.assertTrue(np.all((items >= 0) & (items < 5)))
+        scale = feature_scale(NumGame(3, c=5))[10*5 + 3 + 9]
+        self.assertTrue(np.all(items / scale < 1))
+
+    def test_replay_buffer(self):
+        buffer = ReplayBuffer(5, 2, target_size=1, rng=0)
+        buffer.add(np.arange(6).reshape(3, 2), np.arange(3),
+                   np.zeros((3, 1)))
+        self.assertEqual(len(buffer), 3)
+        buffer.add(np.arange(8).reshape(4, 2) + 10, np.arange(4),
+                   np.ones((4, 1)))
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(buffer.states[:2].tolist(), [[14, 15], [16, 17]])
+        buffer.add(np.arange(14).reshape(7, 2), np.arange(7),
+                   np.ones((7, 1)))
+        self.assertEqual(sorted(buffer.states[:, 0]), [4, 6, 8, 10, 12])
+        prioritized = ReplayBuffer(4, 1, target_size=1, prioritized=True,
+                                   rng=0)
+        prioritized.add(np.arange(4).reshape(4, 1), np.zeros(4, int),
+                        np.zeros((4, 1)))
+        prioritized.update_priorities(np.arange(4), np.array([0, 0, 0, 1.0]))
+        indices, states, _, _ = prioritized.sample(20)
+        self.assertTrue(np.all(states[:, 0] == 3))
+
+    def test_stream(self):
+        with SelfPlayStream([RandomAgent, PassAgent], workers=2,
+                            capacity=500, batch_size=16, min_size=50,
+                            targets=(0, 1), c=5) as stream:
+            net = ANN.generated_net(stream.input_size(), 4, 2, rnd=True)
+            for _, (in_matrix, targets) in zip(range(5), stream):
+                self.assertEqual(in_matrix.shape, (16, stream.input_size()))
+                self.assertEqual(targets.shape, (16, 2))
+                net.train_batch(in_matrix, targets)
+            self.assertTrue(len(stream.buffer) >= 50)
+        game = NumGame(2, c=5)
+        scaled = features(game.encode()[None, :], np.array([1]),
+                          feature_scale(game), 2)
+        self.assertEqual(scaled[0, -2:].tolist(), [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
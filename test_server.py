@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from numgame import NumGame
+from server import GameServer, publicstate, delta, apply_delta
+
+
+async def send(writer, message):
+    writer.write((json.dumps(message) + "\n").encode())
+    await writer.drain()
+
+
+async def play(reader, writer, choose):
+    """
+    Client stand-in: follows state deltas, answers turns with
+    choose(state) (None to stay silent), returns (state, messages)
+    """
+    state = None
+    messages = []
+    while True:
+        message = json.loads(await reader.readline())
+        messages.append(message)
+        if message["type"] == "state":
+            state = message["state"]
+        elif message["type"] == "delta":
+            apply_delta(state, message["delta"])
+        elif message["type"] == "turn":
+            action = choose(state)
+            if action != None:
+                await send(writer, {"op": "act", "game": message["game"],
+                                    "action": action})
+        elif message["type"] == "end":
+            return state, messages
+
+
+class TestServer(unittest.TestCase):
+
+    def test_unsold_area(self):
+        game = NumGame(2, c=4, rng=1)
+        phase = game.currentphase
+        phase.pass_bid()
+        phase.pass_bid()
+        self.assertIsNone(publicstate(game)["area"])
+        game.nextphase()
+        game.nextphase()
+        phase = game.currentphase
+        phase.bid(1000)
+        phase.pass_bid()
+        self.assertEqual(publicstate(game)["area"], phase.area)
+
+    def test_delta(self):
+        old = {"cells": [0, 1], "funds": [5, 5], "type": "auction", "item": 1}
+        new = {"cells": [1, 1], "funds": [5, 3], "type": "payday"}
+        changes = delta(old, new)
+        self.assertEqual(changes, {"cells": [[0, 1]], "funds": [[1, 3]],
+                                   "type": "payday", "item": None})
+        apply_delta(old, changes)
+        self.assertEqual({k: v for k, v in old.items() if v != None}, new)
+
+    def test_play_tcp(self):
+        async def main():
+            server = GameServer(timeout=5)
+            listener = await server.start("127.0.0.1", 0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await send(writer, {"op": "new", "players": 3, "c": 4, "seed": 2,
+                                "bots": ["random", "random"]})
+            error = json.loads(await reader.readline())
+            self.assertEqual(error["type"], "error")
+            await send(writer, {"op": "new", "players": 3, "c": 4,
+                                "bots": ["random", "random"]})
+            joined = json.loads(await reader.readline())
+            self.assertEqual(joined["seat"], 0)
+            hosted = server.games[joined["game"]]
+            bids = []
+
+            def choose(state):
+                if not bids:
+                    bids.append(1)
+                    return ["bid", 1] # illegal, answered with an error
+                return ["pass", None]
+            state, messages = await play(reader, writer, choose)
+            self.assertEqual(state, publicstate(hosted.game))
+            self.assertIn("error", [m["type"] for m in messages])
+            self.assertEqual(messages[-1]["winner"],
+                             hosted.game.rowinfo(hosted.game.winner())[0])
+            self.assertEqual(server.games, {})
+            writer.close()
+            listener.close()
+        asyncio.run(main())
+
+    def test_limits(self):
+        server = GameServer()
+        for message in [{"players": 10**9}, {"players": 0}, {"c": 10**6},
+                        {"areas": 10**6}, {"timeout": 1e300},
+                        {"timeout": float("nan")}, {"c": 4.5},
+                        {"players": True}, {"timeout": "30"}]:
+            message = dict({"op": "new", "players": 2}, **message)
+            self.assertIn("should be from", server.dispatch(None, message))
+        self.assertEqual(server.games, {})
+
+    def test_timeout_unix(self):
+        async def main():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "server.sock")
+                server = GameServer()
+                listener = await server.start(path=path)
+                reader, writer = await asyncio.open_unix_connection(path)
+                await send(writer, {"op": "new", "players": 2, "c": 3,
+                                    "bots": ["random"], "timeout": 0.01})
+                joined = json.loads(await reader.readline())
+                hosted = server.games[joined["game"]]
+                state, messages = await play(reader, writer, lambda s: None)
+                self.assertTrue(any(m["type"] == "turn" for m in messages))
+                for row in range(1, hosted.game.r, 2): # player 0 passed
+                    self.assertEqual(sum(hosted.game.board[row]), 0)
+                writer.close()
+                listener.close()
+        asyncio.run(main())
+
+    def test_many_games(self):
+        async def main():
+            server = GameServer()
+            listener = await server.start("127.0.0.1", 0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            for game in range(200):
+                await send(writer, {"op": "new", "players": 2, "c": 3,
+                                    "bots": ["random", "pass"]})
+            ends = 0
+            while ends < 200:
+                message = json.loads(await reader.readline())
+                if message["type"] == "joined":
+                    self.assertEqual(message["seat"], None)
+                ends += message["type"] == "end"
+            self.assertEqual(server.games, {})
+            writer.close()
+            listener.close()
+        asyncio.run(main())
+
+
+if __name__ == "__main__":
+    unittest.main()
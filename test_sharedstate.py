@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import unittest
+from numgame import NumGame
+from agents import RandomAgent, play_step
+from sharedstate import SharedGame, GameView
+
+
+def readview(args):
+    name, player = args
+    view = GameView(name)
+    generation = view.acquire()
+    phase = view.currentphase
+    result = (generation, view.rowweights().tolist(),
+              view.colfreqs().tolist(), view.has(player, 1, phase.item),
+              phase.can_check(), phase.highest_bid, phase.activeplayer)
+    view.close()
+    return result
+
+
+class TestSharedState(unittest.TestCase):
+
+    def setUp(self):
+        self.game = NumGame(3, c=5, rng=3)
+        agent = RandomAgent(rng=3)
+        for phase, player in self.game:
+            if phase.type == "auction":
+                if self.game.areapos == 8 and player == 1:
+                    phase.check()
+                    phase.bid(phase.highest_bid + 1000)
+                    break
+                play_step(agent, phase, player)
+        self.shared = SharedGame.from_game(self.game)
+
+    def tearDown(self):
+        self.shared.close()
+        self.shared.unlink()
+
+    def test_view(self):
+        game = self.game
+        view = GameView(self.shared.name)
+        generation = view.acquire()
+        self.assertEqual(generation, 2)
+        self.assertEqual(view.rowweights().tolist(),
+                         game.rowweights().tolist())
+        self.assertEqual(view.colfreqs().tolist(), game.colfreqs().tolist())
+        self.assertEqual(view.winner(), game.winner())
+        phase, shown = game.currentphase, view.currentphase
+        for name in ("type", "active", "activeplayer", "highest_bid",
+                     "highest_bidder", "hidden", "checked", "item",
+                     "BIDDING_STEP"):
+            self.assertEqual(getattr(shown, name), getattr(phase, name))
+        self.assertEqual(shown.can_check(), phase.can_check())
+        for area in range(1, 4):
+            self.assertEqual(view.has(2, area, phase.item),
+                             game.has(2, area, phase.item))
+        copy = view.togame()
+        self.assertEqual(copy.encode().tolist(), game.encode().tolist())
+        self.assertEqual(copy.currentphase.item, phase.item)
+        with self.assertRaises(ValueError):
+            view.board[0, 0] = 1
+        phase.pass_bid()
+        self.assertFalse(view.changed(generation))
+        self.assertEqual(self.shared.publish(game), 4)
+        self.assertTrue(view.changed(generation))
+        self.assertEqual(view.currentphase.activeplayer, phase.activeplayer)
+        view.close()
+
+    def test_workers(self):
+        phase = self.game.currentphase
+        with multiprocessing.Pool(2) as pool:
+            results = pool.map(readview, [(self.shared.name, player)
+                                          for player in range(3)])
+        for player, result in enumerate(results):
+            self.assertEqual(result, (
+                2, self.game.rowweights().tolist(),
+                self.game.colfreqs().tolist(),
+                self.game.has(player, 1, phase.item), phase.can_check(),
+                phase.highest_bid, phase.activeplayer))
+
+
+if __name__ == "__main__":
+    unittest.main()
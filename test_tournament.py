@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+import functools
+import time
+import unittest
+from agents import PassAgent, RandomAgent
+from ismcts import ISMCTSAgent
+from tournament import (play_games, seating, tournament, wilson,
+                        TournamentStats)
+
+
+class TestTournament(unittest.TestCase):
+
+    def test_seating(self):
+        combinations = set()
+        for index in range(3*6):
+            seats, starter = seating(index, 3)
+            self.assertEqual(sorted(seats), [0, 1, 2])
+            combinations.add((tuple(seats), starter))
+        self.assertEqual(len(combinations), 18)
+
+    def test_pool_same_as_inline(self):
+        factories = [functools.partial(RandomAgent, rng=1), PassAgent]
+        inline = list(play_games(factories, 8, processes=1, seed=3, c=5))
+        pooled = list(play_games(factories, 8, processes=2, seed=3, c=5))
+        pooled.sort(key=lambda result: result.index)
+        self.assertEqual([repr(r) for r in inline], [repr(r) for r in pooled])
+
+    def test_close_early(self):
+        """
+        Closing the generator does not wait for the games not started
+        """
+        factories = [functools.partial(ISMCTSAgent, iterations=20, rng=1),
+                     PassAgent]
+        start = time.perf_counter()
+        one = list(play_games(factories, 2, processes=2, seed=1, c=4,
+                              chunksize=1))
+        single = time.perf_counter() - start
+        start = time.perf_counter()
+        results = play_games(factories, 200, processes=2, seed=1, c=4,
+                             chunksize=1)
+        next(results)
+        results.close()
+        self.assertEqual(len(one), 2)
+        self.assertLess(time.perf_counter() - start, 10 * single + 1)
+
+    def test_parallel_agent(self):
+        """
+        Agents searching in their own processes work in pooled games
+        """
+        factories = [functools.partial(ISMCTSAgent, iterations=10,
+                                       processes=2, rng=1), PassAgent]
+        results = list(play_games(factories, 2, processes=2, seed=1, c=4))
+        self.assertEqual(sorted(r.index for r in results), [0, 1])
+
+    def test_stats(self):
+        results = []
+        stats = tournament([RandomAgent, PassAgent], 12, processes=1, c=5,
+                           progress=lambda stats, r: results.append(r))
+        self.assertEqual(stats.games, 12)
+        self.assertEqual(len(results), 12)
+        self.assertEqual(sum(stats.wins) + stats.kingwins, 12)
+        rate, low, high = stats.winrate(0)
+        self.assertTrue(low <= rate <= high)
+        self.assertEqual(stats.meanlength()[0],
+                         sum(r.auctions for r in results) / 12)
+        self.assertAlmostEqual(wilson(5, 10)[0], 0.5)
+        self.assertEqual(TournamentStats(2).winrate(0), (0.0, 0.0, 1.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,21 @@
 # -*- coding: utf-8 -*-
 
+import random
+from copy import deepcopy
 import unittest
+import numpy as np
 from numgame import NumGame
+from bitgame import BitGame
+from sparsegame import SparseGame
 from game import *
 
 
 class TestGame(unittest.TestCase):
 
+    game_cls = NumGame
+
     def setUp(self):
-        self.ng = NumGame(players=1, c=5)
+        self.ng = self.game_cls(players=1, c=5)
         self.ng.set(2, 3)
         self.ng.set(1, 3)
         self.ng.setforplayer(player=0, c=1, area=1)
@@ -18,7 +25,7 @@ class TestGame(unittest.TestCase):
         self.assertEqual(1, ng.board[2][3])
         self.assertEqual(ng.rowinfo(2), (0, 2))
         self.assertEqual(ng.rowinfo(0), (None, 0))
-        ng3 = NumGame(players=3, c=5)
+        ng3 = self.game_cls(players=3, c=5)
         self.assertEqual(ng3.rowinfo(5), (1, 2))
         self.assertEqual(ng.colfreqs().tolist(), [0, 1, 0, 2, 0])
         self.assertEqual(ng.rowweights().tolist(), [0, 3, 2, 0])
@@ -26,6 +33,20 @@ class TestGame(unittest.TestCase):
         self.assertEqual(ng.colfreqs().tolist(), [2, 1, 0, 2, 0])
         self.assertEqual(ng.rowweights().tolist(), [2, 3, 2, 0])
 
+    def test_cached_weights(self):
+        ng = self.game_cls(players=3, c=6)
+        for i in range(200):
+            r = random.randrange(ng.r)
+            c = random.randrange(ng.c)
+            ng.set(r, c, random.choice([0, 1]))
+            board = np.array([ng.board[i] for i in range(ng.r)])
+            colfreqs = board.sum(axis=0) + board[0]
+            rowweights = (board * colfreqs).sum(axis=1)
+            self.assertEqual(ng.colfreqs().tolist(), colfreqs.tolist())
+            self.assertEqual(ng.rowweights().tolist(), rowweights.tolist())
+            self.assertEqual(ng.leader(), (rowweights.argmax(),
+                                           rowweights.max()))
+
     def test_cards(self):
         areaselection = set()
         abilityselection = set()
@@ -43,6 +64,20 @@ class TestGame(unittest.TestCase):
         self.assertEqual(areaselection, {0, 1, 2, 3})
         self.assertEqual(abilityselection, {0, 1, 2, 3, 4})
         
+    def test_seeded_decks(self):
+        ng1 = self.game_cls(players=2, c=5, rng=7)
+        ng2 = self.game_cls(players=2, c=5, rng=np.random.default_rng(7))
+        self.assertEqual(ng1.areadeck.tolist(), ng2.areadeck.tolist())
+        self.assertEqual(ng1.abilitydeck.tolist(), ng2.abilitydeck.tolist())
+        self.assertEqual(ng1.decksizes(), (20, 20))
+        state = ng1.deckstate()
+        cards = [(ng1.poparea(), ng1.popability()) for i in range(20)]
+        self.assertEqual(ng1.decksizes(), (0, 0))
+        self.assertNotEqual(ng1.winner(), None)
+        ng1.setdeckstate(state)
+        self.assertEqual(cards[0], (ng1.hiddenarea(), ng1.hiddenability()))
+        self.assertEqual(ng1.decksizes(), (20, 20))
+
     def test_buy(self):
         a_change = False
         c_change = False
@@ -71,7 +106,7 @@ class TestGame(unittest.TestCase):
         self.assert_(c_change)
      
     def test_end(self):
-        endgame = NumGame(players=2, c=9)
+        endgame = self.game_cls(players=2, c=9)
         self.assertEqual(endgame.winner(), None)
         self.assertEqual(endgame.winamount, 14)
         endgame.setforking(0)
@@ -101,9 +136,10 @@ class TestGame(unittest.TestCase):
 
 class TestAuctionPhase(unittest.TestCase):
     
+    game_cls = NumGame
  
     def setUp(self):
-        self.ng = NumGame(players=3, c=5)
+        self.ng = self.game_cls(players=3, c=5)
         self.phase = self.ng.currentphase
         
     def test(self):
@@ -183,10 +219,232 @@ class TestAuctionPhase(unittest.TestCase):
         self.assertEqual(self.ng.auctionstarter, 1)
         self.assertEqual(self.ng.currentphase.type, "auction")
         self.assert_(self.ng.currentphase.active)
-        
-        
-        
-        
-        
 
-unittest.main()
\ No newline at end of file
+
+
+class TestMakeUnmake(unittest.TestCase):
+
+    game_cls = NumGame
+
+    def snapshot(self, game):
+        return (repr(game), game.deckstate(), game.decksizes(),
+                game.auctionstarter, game.currentphase.checked[:])
+
+    def random_action(self, phase):
+        actions = [PASS]
+        if phase.can_check():
+            actions.append(CHECK)
+        if phase.can_hide():
+            actions.append(HIDE)
+        bid = phase.highest_bid + phase.BIDDING_STEP
+        if phase.playerfunds() >= bid:
+            actions.append(("bid", bid))
+            actions.append(("bid", bid))
+        return random.choice(actions)
+
+    def test_make_unmake(self):
+        game = self.game_cls(players=3, c=4)
+        snapshots = []
+        undos = []
+        while game.winner() == None:
+            snapshots.append(self.snapshot(game))
+            undos.append(game.make(self.random_action(game.currentphase)))
+            if game.winner() == None:
+                self.assertTrue(game.currentphase.active)
+        self.assertTrue(len(undos) > 3*4)
+        while undos:
+            game.unmake(undos.pop())
+            self.assertEqual(self.snapshot(game), snapshots.pop())
+
+    def test_same_as_iteration(self):
+        game = self.game_cls(players=2, rng=3)
+        actions = []
+        while game.winner() == None:
+            actions.append(self.random_action(game.currentphase))
+            game.make(actions[-1])
+        replayed = self.game_cls(players=2, rng=3)
+        actions.reverse()
+        for phase, player in replayed:
+            while phase.type == "auction" and phase.activeplayer == player:
+                phase.act(actions.pop())
+        self.assertEqual(repr(game), repr(replayed))
+        self.assertEqual(game.winner(), replayed.winner())
+
+
+class TestEncoding(unittest.TestCase):
+
+    game_cls = NumGame
+
+    def test_encode_decode(self):
+        game = self.game_cls(players=3, c=4, rng=5)
+        copy = self.game_cls(players=3, c=4, rng=5)
+        keys = set()
+        while game.winner() == None:
+            self.assertEqual(game.hash, game.zobrist())
+            vector = game.encode()
+            self.assertEqual(len(vector), game.encodedsize())
+            copy.decode(vector)
+            self.assertEqual(copy.encode().tolist(), vector.tolist())
+            self.assertEqual(copy.hash, game.hash)
+            self.assertEqual(copy.statehash(), game.statehash())
+            self.assertEqual(copy.statekey(), game.statekey())
+            step = game.currentphase.steps[-1]
+            self.assertEqual(copy.currentphase.steps[-1].checked, step.checked)
+            self.assertNotIn(game.statekey(), keys)
+            keys.add(game.statekey())
+            phase = game.currentphase
+            action = TestMakeUnmake.random_action(None, phase)
+            undo = game.make(action)
+            statehash = game.statehash()
+            game.unmake(undo)
+            self.assertEqual(game.encode().tolist(), vector.tolist())
+            self.assertEqual(game.hash, game.zobrist())
+            game.make(action)
+            self.assertEqual(game.statehash(), statehash)
+
+    def test_copy_hash(self):
+        """
+        Copies keep their hash without a copy of the cell keys
+        """
+        game = self.game_cls(players=3, c=4, rng=5)
+        game.make(("bid", 1000))
+        keys = zobristkeys(game.r, game.c)
+        self.assertFalse(any(value is keys for value in vars(game).values()))
+        copy = deepcopy(game)
+        copy.make(PASS)
+        copy.make(PASS)
+        self.assertEqual(copy.hash, copy.zobrist())
+        self.assertNotEqual(copy.hash, game.hash)
+
+    def test_finished(self):
+        """
+        Finished games decode though the cursors are past the decks
+        """
+        random.seed(0)
+        exhausted = 0
+        for seed in range(50):
+            game = self.game_cls(players=3, c=4, rng=seed)
+            while game.winner() == None:
+                # Passing a lot runs through the decks
+                if seed % 2 or random.random() < 0.8:
+                    game.make(PASS)
+                else:
+                    game.make(TestMakeUnmake.random_action(
+                        None, game.currentphase))
+            exhausted += 0 in game.decksizes()
+            copy = self.game_cls(players=3, c=4, rng=seed)
+            copy.decode(game.encode())
+            self.assertEqual(copy.encode().tolist(), game.encode().tolist())
+            self.assertEqual(copy.winner(), game.winner())
+            if game.currentphase.type == "auction":
+                self.assertEqual(copy.currentphase.item,
+                                 game.currentphase.item)
+        self.assertGreater(exhausted, 0)
+
+    def test_item(self):
+        """
+        Auctions differing only by the item on sale have different keys
+        """
+        game1 = self.game_cls(players=3, c=5, rng=1)
+        game2 = self.game_cls(players=3, c=5, rng=2)
+        self.assertNotEqual(game1.currentphase.item, game2.currentphase.item)
+        self.assertNotEqual(game1.statekey(), game2.statekey())
+        self.assertNotEqual(game1.statehash(), game2.statehash())
+        game2.decode(game1.encode())
+        self.assertEqual(game2.currentphase.item, game1.currentphase.item)
+
+    def test_payday(self):
+        game = self.game_cls(players=2, rng=1)
+        game.currentphase.pass_bid()
+        game.currentphase.pass_bid()
+        game.nextphase()
+        copy = self.game_cls(players=2, rng=1)
+        copy.decode(game.encode())
+        self.assertEqual(copy.currentphase.type, "payday")
+        self.assertEqual(copy.playerfunds, game.playerfunds)
+        self.assertEqual(copy.statehash(), game.statehash())
+        copy.nextphase()
+        game.nextphase()
+        self.assertEqual(copy.encode().tolist(), game.encode().tolist())
+
+
+class TestBitGame(TestGame):
+
+    game_cls = BitGame
+
+    def test_boardkey(self):
+        bg = BitGame(players=2, c=5)
+        key = bg.boardkey()
+        bg.setforplayer(1, 2, 4)
+        self.assertNotEqual(key, bg.boardkey())
+        bg.setforplayer(1, 2, 4, val=0)
+        self.assertEqual(key, bg.boardkey())
+
+
+class TestBitAuctionPhase(TestAuctionPhase):
+
+    game_cls = BitGame
+
+
+class TestBitMakeUnmake(TestMakeUnmake):
+
+    game_cls = BitGame
+
+
+class TestBitEncoding(TestEncoding):
+
+    game_cls = BitGame
+
+
+class TestSparseGame(TestGame):
+
+    game_cls = SparseGame
+
+    def test_same_as_numgame(self):
+        """
+        Random games with many players play out like NumGame
+        """
+        for seed in range(5):
+            played = []
+            bidder = random.Random(seed)
+            for cls in (NumGame, SparseGame):
+                game = cls(players=8, c=12, areas=4, rng=seed)
+                actions = iter(played[0][0]) if played else None
+                taken = []
+                states = []
+                for phase, player in game:
+                    states.append((game.rowweights().tolist(),
+                                   game.colfreqs().tolist(), game.leader()))
+                    if phase.type == "auction":
+                        if actions != None:
+                            action = next(actions)
+                        else:
+                            bid = phase.highest_bid + phase.BIDDING_STEP
+                            action = PASS
+                            if (bidder.random() < 0.5 and
+                                    phase.playerfunds() >= bid):
+                                action = ("bid", bid)
+                        phase.act(action)
+                        taken.append(action)
+                played.append((taken, states, game.boardvector().tolist(),
+                               game.winner(), game.playerfunds, game.hash))
+            self.assertEqual(played[0], played[1])
+
+
+class TestSparseAuctionPhase(TestAuctionPhase):
+
+    game_cls = SparseGame
+
+
+class TestSparseMakeUnmake(TestMakeUnmake):
+
+    game_cls = SparseGame
+
+
+class TestSparseEncoding(TestEncoding):
+
+    game_cls = SparseGame
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Agent against agent tournaments in a process pool.
+
+Agents are given as factories, callables returning a fresh Agent for
+every game (classes, functools.partial objects, module level functions),
+so they can be sent to worker processes.
+
+for result in play_games([RandomAgent, PassAgent], 1000):
+    ...
+or
+stats = tournament([RandomAgent, PassAgent], 1000)
+"""
+
+import concurrent.futures
+import itertools
+import math
+import os
+import time
+import numpy as np
+from numgame import NumGame
+from agents import play_step
+
+
+class GameResult:
+    """
+    Outcome of one tournament game.
+    seats[seat] is the index of the agent playing as that player,
+    winner is an agent index or None if the King won,
+    funds[agent] are final funds, auctions is the game length.
+    """
+
+    def __init__(self, index, seats, starter, winner, funds, auctions,
+                 seconds):
+        self.index = index
+        self.seats = seats
+        self.starter = starter
+        self.winner = winner
+        self.funds = funds
+        self.auctions = auctions
+        self.seconds = seconds
+
+    def __repr__(self):
+        return "Game {0}: seats {1}, winner {2}, funds {3}, {4} auctions" \
+            .format(self.index, self.seats, self.winner, self.funds,
+                    self.auctions)
+
+
+def seating(index, players):
+    """
+    Seats and first auction starter for game index. Seats go through
+    all orders of the agents, then the starter moves on, so every agent
+    meets every seat, neighbour and starter combination equally often.
+    """
+    orders = math.factorial(players)
+    seats = []
+    left = list(range(players))
+    rest = index % orders
+    for i in range(players, 0, -1):
+        orders //= i
+        seats.append(left.pop(rest // orders))
+        rest %= orders
+    starter = (index // math.factorial(players)) % players
+    return seats, starter
+
+
+def play_game(factories, index, seed=0, game_cls=NumGame, **gameargs):
+    """
+    Plays game index of a tournament, returns GameResult
+    """
+    start = time.perf_counter()
+    players = len(factories)
+    seats, starter = seating(index, players)
+    agents = [factories[agent]() for agent in seats]
+    game = game_cls(players, rng=np.random.SeedSequence([seed, index]),
+                    auctionstarter=starter, **gameargs)
+    for phase, player in game:
+        if phase.type == "auction":
+            play_step(agents[player], phase, player)
+    for agent in agents:
+        if hasattr(agent, "close"):
+            agent.close()
+    seat, _ = game.rowinfo(game.winner())
+    winner = None if seat == None else seats[seat]
+    funds = [0] * players
+    for seat, agent in enumerate(seats):
+        funds[agent] = game.playerfunds[seat]
+    return GameResult(index, seats, starter, winner, funds, game.areapos,
+                      time.perf_counter() - start)
+
+
+def playworker(args):
+    factories, index, seed, game_cls, gameargs = args
+    return play_game(factories, index, seed, game_cls, **gameargs)
+
+
+def chunkworker(jobs):
+    return [playworker(job) for job in jobs]
+
+
+def play_games(factories, games, processes=None, seed=0, game_cls=NumGame,
+               chunksize=None, **gameargs):
+    """
+    Generator yielding GameResults as games finish, in any order.
+    processes=None uses all cores, 1 plays in this process. Workers
+    play chunksize games per task, by default up to 50 while keeping
+    every worker busy. At most two tasks per worker are queued, so
+    closing the generator early stops after the running ones.
+    """
+    jobs = ((factories, index, seed, game_cls, gameargs)
+            for index in range(games))
+    if processes == 1:
+        for job in jobs:
+            yield playworker(job)
+        return
+    workers = processes or os.cpu_count() or 1
+    if chunksize == None:
+        chunksize = max(1, min(50, games // (4 * workers)))
+    chunks = iter(lambda: list(itertools.islice(jobs, chunksize)), [])
+    # Executor workers are not daemons, so agents may start processes
+    executor = concurrent.futures.ProcessPoolExecutor(processes)
+    pending = set()
+    try:
+        for chunk in itertools.islice(chunks, 2 * workers):
+            pending.add(executor.submit(chunkworker, chunk))
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for chunk in itertools.islice(chunks, len(done)):
+                pending.add(executor.submit(chunkworker, chunk))
+            for future in done:
+                yield from future.result()
+    finally:
+        executor.shutdown(wait=not pending, cancel_futures=True)
+
+
+class TournamentStats:
+    """
+    Running totals of GameResults for agents 0..agents-1
+    """
+
+    def __init__(self, agents):
+        self.agents = agents
+        self.games = 0
+        self.wins = [0] * agents
+        self.kingwins = 0
+        self.funds = [0.0] * agents
+        self.funds_sq = [0.0] * agents
+        self.auctions = 0.0
+        self.auctions_sq = 0.0
+
+    def add(self, result):
+        self.games += 1
+        if result.winner == None:
+            self.kingwins += 1
+        else:
+            self.wins[result.winner] += 1
+        for agent, funds in enumerate(result.funds):
+            self.funds[agent] += funds
+            self.funds_sq[agent] += funds**2
+        self.auctions += result.auctions
+        self.auctions_sq += result.auctions**2
+
+    def winrate(self, agent, z=1.96):
+        """
+        (rate, low, high) with a Wilson score interval
+        """
+        return wilson(self.wins[agent], self.games, z)
+
+    def meanfunds(self, agent, z=1.96):
+        """
+        (mean, low, high) with a normal approximation interval
+        """
+        return meaninterval(self.funds[agent], self.funds_sq[agent],
+                            self.games, z)
+
+    def meanlength(self, z=1.96):
+        return meaninterval(self.auctions, self.auctions_sq, self.games, z)
+
+    def __repr__(self):
+        lines = ["{0} games, King won {1}".format(self.games, self.kingwins)]
+        for agent in range(self.agents):
+            lines.append("Agent {0}: wins {1:.3f} [{2:.3f}, {3:.3f}], "
+                         "funds {4:.0f} [{5:.0f}, {6:.0f}]".format(
+                             agent, *(self.winrate(agent) +
+                                      self.meanfunds(agent))))
+        lines.append("Auctions {0:.2f} [{1:.2f}, {2:.2f}]".format(
+            *self.meanlength()))
+        return "\n".join(lines)
+
+
+def wilson(successes, n, z=1.96):
+    if n == 0:
+        return (0.0, 0.0, 1.0)
+    p = successes / n
+    center = (p + z*z/(2*n)) / (1 + z*z/n)
+    half = z * math.sqrt(p*(1-p)/n + z*z/(4*n*n)) / (1 + z*z/n)
+    return (p, center - half, center + half)
+
+
+def meaninterval(total, total_sq, n, z=1.96):
+    if n == 0:
+        return (0.0, 0.0, 0.0)
+    mean = total / n
+    if n == 1:
+        return (mean, mean, mean)
+    var = max(total_sq - n*mean*mean, 0.0) / (n - 1)
+    half = z * math.sqrt(var / n)
+    return (mean, mean - half, mean + half)
+
+
+def tournament(factories, games, processes=None, seed=0, progress=None,
+               **kwargs):
+    """
+    Plays games and returns TournamentStats. progress(stats, result)
+    is called after every finished game if given.
+    """
+    stats = TournamentStats(len(factories))
+    for result in play_games(factories, games, processes, seed, **kwargs):
+        stats.add(result)
+        if progress != None:
+            progress(stats, result)
+    return stats
+
+
+if __name__ == "__main__":
+    from agents import RandomAgent, PassAgent
+    print(tournament([RandomAgent, PassAgent, RandomAgent], 3000))